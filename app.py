@@ -1,11 +1,22 @@
+import os
+import importlib
+import threading
 import streamlit as st
 
-from pages.how_it_works import how_it_works_page
-from pages.prediction import predict_page
-from pages.donate_sell import donate_sell_page
-from pages.rewards import rewards_page
-from pages.about import about_page
-from pages.home import home_pages
+# Page modules are imported on first visit, so Home / About / Rewards never
+# pay for TensorFlow or the model
+PAGES = {
+    "Home": ("pages.home", "home_pages"),
+    "How Our Model Works": ("pages.how_it_works", "how_it_works_page"),
+    "Predict Waste Bin": ("pages.prediction", "predict_page"),
+    "Donate / Sell": ("pages.donate_sell", "donate_sell_page"),
+    "Rewards": ("pages.rewards", "rewards_page"),
+    "About Us": ("pages.about", "about_page"),
+}
+
+# Optionally load the model on a background thread at startup so the first
+# visit to the prediction page does not wait for it
+PREWARM_MODEL = os.environ.get("ECOVISION_PREWARM", "0") == "1"
 
 # --------------------------------------------------
 # App Config
@@ -22,14 +33,7 @@ st.set_page_config(
 st.sidebar.title("♻️ EcoVision")
 page = st.sidebar.radio(
     "Navigate",
-    [
-        "Home",
-        "How Our Model Works",
-        "Predict Waste Bin",
-        "Donate / Sell",
-        "Rewards",
-        "About Us"
-    ]
+    list(PAGES)
 )
 
 # --------------------------------------------------
@@ -39,22 +43,22 @@ if "points" not in st.session_state:
     st.session_state.points = 0
 
 # --------------------------------------------------
-# Page Routing
+# Model Pre-warm (once per process)
 # --------------------------------------------------
-if page == "Home":
-    home_pages()
-
-elif page == "How Our Model Works":
-    how_it_works_page()
-
-elif page == "Predict Waste Bin":
-    predict_page()
+@st.cache_resource
 
-elif page == "Donate / Sell":
-    donate_sell_page()
+def start_prewarm():
+    from pages.prediction import load_engine
+    thread = threading.Thread(target=load_engine, name="model-prewarm", daemon=True)
+    thread.start()
+    return thread
 
-elif page == "Rewards":
-    rewards_page()
+# Nothing to load locally when classifying through serve.py
+if PREWARM_MODEL and not os.environ.get("ECOVISION_INFERENCE_URL"):
+    start_prewarm()
 
-elif page == "About Us":
-    about_page()
\ No newline at end of file
+# --------------------------------------------------
+# Page Routing
+# --------------------------------------------------
+module_name, func_name = PAGES[page]
+getattr(importlib.import_module(module_name), func_name)()
@@ -1,5 +1,10 @@
 import os
+import json
 import shutil
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
 
 SOURCE_DIRS = [
     "Hazardous/Hazardous",
@@ -9,19 +14,307 @@ SOURCE_DIRS = [
 ]
 
 TARGET_DIR = "dataset"
+QUARANTINE_DIR = "dataset_quarantine"
+MANIFEST_PATH = "dataset_manifest.json"
 
-os.makedirs(TARGET_DIR, exist_ok=True)
+IMAGE_EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png")
+NEAR_DUP_THRESHOLD = 3      # max differing bits between 64-bit dHashes
+CHECKPOINT_EVERY = 2000     # files between manifest checkpoints
 
-for src_root in SOURCE_DIRS:
-    for class_name in os.listdir(src_root):
-        src_path = os.path.join(src_root, class_name)
-        dst_path = os.path.join(TARGET_DIR, class_name)
+# --------------------------------------------------
+# Flatten
+# --------------------------------------------------
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-        if os.path.isdir(src_path):
-            if not os.path.exists(dst_path):
-                shutil.move(src_path, dst_path)
-                print(f"✅ Moved {class_name}")
-            else:
-                print(f"⚠️ Skipped {class_name} (already exists)")
 
-print("\n🎉 Dataset successfully flattened into 18 classes")
\ No newline at end of file
+def flatten(source_dirs, target_dir, copy=False):
+    # Merges every <source>/<class>/ into <target>/<class>/ file by file.
+    # Re-running is safe: moved files are gone from the source, identical
+    # files already in place are skipped, and different files with the
+    # same name get a content-hash suffix instead of being dropped.
+    transfer = shutil.copy2 if copy else shutil.move
+    moved = 0
+
+    for src_root in source_dirs:
+        if not os.path.isdir(src_root):
+            print(f"⚠️ Skipped {src_root} (not found)")
+            continue
+
+        for class_name in sorted(os.listdir(src_root)):
+            src_path = os.path.join(src_root, class_name)
+            if not os.path.isdir(src_path):
+                continue
+
+            dst_path = os.path.join(target_dir, class_name)
+            os.makedirs(dst_path, exist_ok=True)
+
+            for name in sorted(os.listdir(src_path)):
+                src_file = os.path.join(src_path, name)
+                if not os.path.isfile(src_file):
+                    continue
+
+                dst_file = os.path.join(dst_path, name)
+                if os.path.exists(dst_file):
+                    digest = _file_sha256(src_file)
+                    if digest == _file_sha256(dst_file):
+                        if not copy:
+                            os.remove(src_file)
+                        continue
+                    stem, ext = os.path.splitext(name)
+                    dst_file = os.path.join(dst_path, f"{stem}__{digest[:8]}{ext}")
+
+                transfer(src_file, dst_file)
+                moved += 1
+
+            print(f"✅ Merged {class_name}")
+
+    return moved
+
+# --------------------------------------------------
+# Scan & validate
+# --------------------------------------------------
+def dhash(image, size=8):
+    # 64-bit difference hash: robust to resizing and recompression
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def _cap_resolution(path, image, max_side):
+    if max(image.size) <= max_side:
+        return image
+    fmt = image.format
+    image = image.convert("RGB") if fmt == "JPEG" else image
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    tmp = path + ".tmp"
+    image.save(tmp, format=fmt or "PNG", **({"quality": 95} if fmt == "JPEG" else {}))
+    os.replace(tmp, path)
+    return image
+
+
+def inspect_file(path, max_side=None):
+    try:
+        with Image.open(path) as image:
+            image.load()  # full decode; verify() alone misses truncated data
+            if max_side:
+                image = _cap_resolution(path, image, max_side)
+            width, height = image.size
+            phash = dhash(image)
+    except Exception as exc:
+        return {"status": "corrupt", "error": f"{type(exc).__name__}: {exc}"}
+
+    stat = os.stat(path)
+    return {
+        "status": "ok",
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_sha256(path),
+        "dhash": f"{phash:016x}",
+        "width": width,
+        "height": height,
+    }
+
+
+def list_files(target_dir):
+    files = []
+    for class_name in sorted(os.listdir(target_dir)):
+        class_dir = os.path.join(target_dir, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for root, dirs, names in os.walk(class_dir):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    files.append((os.path.relpath(path, target_dir), class_name))
+    return files
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, path)
+
+
+def scan(target_dir, manifest, manifest_path, workers=None, max_side=None):
+    # Files whose size and mtime match the previous manifest are not
+    # decoded again, so re-runs only pay for new or changed images
+    previous = manifest.get("files", {})
+    records = {}
+    todo = []
+
+    for rel, class_name in list_files(target_dir):
+        stat = os.stat(os.path.join(target_dir, rel))
+        old = previous.get(rel)
+        if old and old.get("size") == stat.st_size and old.get("mtime_ns") == stat.st_mtime_ns:
+            records[rel] = old
+        else:
+            todo.append((rel, class_name))
+
+    print(f"🔍 {len(records)} files unchanged, {len(todo)} to inspect")
+
+    def work(item):
+        rel, class_name = item
+        record = inspect_file(os.path.join(target_dir, rel), max_side)
+        record["class"] = class_name
+        return rel, record
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for n, (rel, record) in enumerate(pool.map(work, todo), 1):
+            records[rel] = record
+            if n % CHECKPOINT_EVERY == 0:
+                # Interrupted runs resume from here
+                save_manifest({**manifest, "files": records}, manifest_path)
+                print(f"   … {n}/{len(todo)}")
+
+    return records
+
+# --------------------------------------------------
+# Duplicates
+# --------------------------------------------------
+def find_exact_duplicates(records):
+    by_hash = {}
+    for rel in sorted(records):
+        record = records[rel]
+        if record["status"] == "ok":
+            by_hash.setdefault(record["sha256"], []).append(rel)
+    return [paths for paths in by_hash.values() if len(paths) > 1]
+
+
+def find_near_duplicate_groups(records, threshold=NEAR_DUP_THRESHOLD):
+    # Split each 64-bit hash into threshold + 1 bands; two hashes within
+    # `threshold` bits must agree exactly on at least one band, so only
+    # band collisions are compared instead of all pairs
+    paths = sorted(r for r in records if records[r]["status"] == "ok")
+    hashes = [int(records[p]["dhash"], 16) for p in paths]
+    parent = list(range(len(paths)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bands = threshold + 1
+    width = 64 // bands
+    for band in range(bands):
+        shift = band * width
+        mask = (1 << (width if band < bands - 1 else 64 - shift)) - 1
+        buckets = {}
+        for i, h in enumerate(hashes):
+            buckets.setdefault((h >> shift) & mask, []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if bin(hashes[i] ^ hashes[j]).count("1") <= threshold:
+                        parent[find(i)] = find(j)
+
+    groups = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(find(i), []).append(path)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def quarantine(target_dir, quarantine_dir, rel):
+    dst = os.path.join(quarantine_dir, rel)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    shutil.move(os.path.join(target_dir, rel), dst)
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main(args):
+    os.makedirs(args.target, exist_ok=True)
+
+    moved = flatten(args.sources, args.target, copy=args.copy)
+    print(f"\n📦 {moved} files merged into {args.target}")
+
+    manifest = load_manifest(args.manifest)
+    records = scan(args.target, manifest, args.manifest, args.workers, args.max_side)
+
+    corrupt = sorted(rel for rel, r in records.items() if r["status"] != "ok")
+    exact = find_exact_duplicates(records)
+
+    if args.quarantine:
+        # Corrupt files and all but the first copy of exact duplicates
+        # would otherwise crash or leak into image_dataset_from_directory
+        for rel in corrupt + [rel for paths in exact for rel in paths[1:]]:
+            quarantine(args.target, QUARANTINE_DIR, rel)
+            records.pop(rel)
+        corrupt_out, exact_out = [], []
+    else:
+        corrupt_out, exact_out = corrupt, exact
+
+    near = find_near_duplicate_groups(records, args.near_dup_threshold)
+
+    # Near-duplicate group ids let the split manifest keep groups together
+    for record in records.values():
+        record.pop("near_dup_group", None)
+    for gid, members in enumerate(near):
+        for rel in members:
+            records[rel]["near_dup_group"] = gid
+
+    class_counts = {}
+    for record in records.values():
+        if record["status"] == "ok":
+            class_counts[record["class"]] = class_counts.get(record["class"], 0) + 1
+
+    manifest = {
+        "target_dir": args.target,
+        "max_side": args.max_side,
+        "near_dup_threshold": args.near_dup_threshold,
+        "class_counts": dict(sorted(class_counts.items())),
+        "corrupt": corrupt_out,
+        "exact_duplicates": exact_out,
+        "near_duplicate_groups": near,
+        "files": records,
+    }
+    save_manifest(manifest, args.manifest)
+
+    print("\n📊 Dataset summary")
+    for class_name, count in manifest["class_counts"].items():
+        print(f"   {class_name:<24} {count}")
+    print(f"\n   corrupt files         : {len(corrupt)}")
+    print(f"   exact duplicate sets  : {len(exact)}")
+    print(f"   near-duplicate groups : {len(near)}")
+    if args.quarantine and (corrupt or exact):
+        print(f"   (moved to {QUARANTINE_DIR}/)")
+
+    print(f"\n🎉 Dataset ready: {len(class_counts)} classes, manifest at {args.manifest}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Flatten, validate and de-duplicate the image dataset.")
+    parser.add_argument("--sources", nargs="*", default=SOURCE_DIRS)
+    parser.add_argument("--target", default=TARGET_DIR)
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-side", type=int, help="Downscale images whose longest side exceeds this (in place)")
+    parser.add_argument("--near-dup-threshold", type=int, default=NEAR_DUP_THRESHOLD)
+    parser.add_argument("--copy", action="store_true", help="Copy instead of moving source files")
+    parser.add_argument("--quarantine", action="store_true", help=f"Move corrupt files and exact duplicates to {QUARANTINE_DIR}/")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -1,57 +1,190 @@
+import os
 import streamlit as st
-import numpy as np
 from PIL import Image
-import tensorflow as tf
 import json
 
 from utils.preprocessing import preprocess_image
 from utils.bin_rules import CLASS_TO_BIN
+from utils.inference import InferenceEngine, load_predictor, top_k
+from utils.prediction_cache import PredictionCache, cache_key, model_version
+from utils.inference_client import RemotePredictor, RemoteInferenceError
+from utils.metrics import REGISTRY as metrics
+from utils.feedback_store import FeedbackStore
+from utils.model_registry import resolve_version, load_version, version_id
+from utils.model_reloader import ModelReloader, timed_load
+from utils.tta import TestTimeAugmentation
 
 # --------------------------------------------------
 # CONFIGURATION
 # --------------------------------------------------
+# Models come from the registry (utils/model_registry.py); "latest" or a
+# pinned version like "v0003". MODEL_PATH and CLASS_NAMES_PATH are only
+# used while the registry is empty.
+MODEL_REGISTRY_DIR = os.environ.get("ECOVISION_MODEL_REGISTRY", "models/registry")
+MODEL_VERSION = os.environ.get("ECOVISION_MODEL_VERSION", "latest")
 MODEL_PATH = "models/waste_classifier.h5"
 CLASS_NAMES_PATH = "class_names.json"
 
+# Seconds between checks for a new model version (LATEST, or MODEL_PATH
+# being replaced); 0 disables hot reload
+MODEL_POLL_INTERVAL_S = float(os.environ.get("ECOVISION_MODEL_POLL_S", "30"))
+
+# "keras" (traced tf.function) or "tflite" (see src/export_tflite.py)
+MODEL_BACKEND = os.environ.get("ECOVISION_BACKEND", "keras")
+TFLITE_MODEL_PATH = os.environ.get(
+    "ECOVISION_TFLITE_MODEL", "models/waste_classifier_int8.tflite"
+)
+
+# Set to the serve.py address (e.g. http://localhost:8000) to classify
+# remotely; this process then never loads TensorFlow or the model
+INFERENCE_URL = os.environ.get("ECOVISION_INFERENCE_URL")
+
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10
+
+# Repeated uploads and widget reruns are served from this cache
+PREDICTION_CACHE_SIZE = 512
+PREDICTION_CACHE_DIR = os.environ.get("ECOVISION_PREDICTION_CACHE_DIR")
+
+# Stage timers and counters are enabled with ECOVISION_METRICS=1; this
+# process dumps them as JSON here since Streamlit cannot serve /metrics
+METRICS_FILE = os.environ.get("ECOVISION_METRICS_FILE", "metrics.json")
+METRICS_DUMP_INTERVAL_S = 30
+
+# Corrections are kept for src/finetune_feedback.py
+FEEDBACK_DIR = os.environ.get("ECOVISION_FEEDBACK_DIR", "feedback")
+
 CONFIDENCE_THRESHOLD = 0.65
+
+# Low-confidence uploads are re-checked with test-time augmentation
+# (utils/tta.py) before asking the user; views are capped by the budget
+TTA_ENABLED = os.environ.get("ECOVISION_TTA", "0") == "1"
+TTA_MAX_VIEWS = 8
+TTA_LATENCY_BUDGET_MS = 250
 POINTS_THROW = 5
 POINTS_DONATE = 10
 POINTS_CORRECT_PRED = 5
 
-# --------------------------------------------------
-# INITIAL SESSION STATE
-# --------------------------------------------------
-if "points" not in st.session_state:
-    st.session_state.points = 0
-
-if "last_prediction" not in st.session_state:
-    st.session_state.last_prediction = None
-
 # --------------------------------------------------
 # LOAD MODEL & METADATA (CACHED)
 # --------------------------------------------------
+def resolve_model():
+    # (version, registry entry or None); cheap enough to poll
+    entry = resolve_version(MODEL_VERSION, MODEL_REGISTRY_DIR)
+    if entry is not None:
+        return version_id(entry), entry
+    return model_version(TFLITE_MODEL_PATH if MODEL_BACKEND == "tflite" else MODEL_PATH), None
+
+def load_resolved_model(entry):
+    # (predictor, cold-load timings); warmed up before it serves,
+    # whichever backend is configured
+    if entry is not None:
+        predictor, timings = load_version(entry, backend=MODEL_BACKEND)
+    elif MODEL_BACKEND == "tflite":
+        predictor, timings = timed_load(load_predictor, TFLITE_MODEL_PATH, backend="tflite")
+    else:
+        predictor, timings = timed_load(load_predictor, MODEL_PATH)
+    return predictor, timings
+
 @st.cache_resource
 
 def load_model():
-    return tf.keras.models.load_model(MODEL_PATH)
+    # Shared by all sessions; polls for new versions and swaps them in
+    # without a restart, so session state (points, badges) survives
+    return ModelReloader(resolve_model, load_resolved_model, MODEL_POLL_INTERVAL_S)
 
 @st.cache_data
 
-def load_class_names():
+def read_class_names_file():
     with open(CLASS_NAMES_PATH, "r") as f:
         return json.load(f)
 
-model = load_model()
-CLASS_NAMES = load_class_names()
+def load_class_names():
+    # A registered version carries the class order it was trained with
+    entry = None if INFERENCE_URL else load_model().current.entry
+    return entry["class_names"] if entry is not None else read_class_names_file()
+
+# One engine per process: concurrent sessions share its batching queue
+@st.cache_resource
+
+def load_engine():
+    return InferenceEngine(
+        load_model(),
+        load_class_names(),
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_WAIT_MS
+    )
+
+@st.cache_resource
+
+def load_tta():
+    # Calls the reloader directly: all views go through as one batch
+    return TestTimeAugmentation(
+        load_model(),
+        max_views=TTA_MAX_VIEWS,
+        latency_budget_ms=TTA_LATENCY_BUDGET_MS
+    )
+
+@st.cache_resource
+
+def load_prediction_cache():
+    return PredictionCache(PREDICTION_CACHE_SIZE, disk_dir=PREDICTION_CACHE_DIR)
+
+@st.cache_resource
+
+def start_metrics_dump():
+    if metrics.enabled:
+        return metrics.start_json_dump(METRICS_FILE, METRICS_DUMP_INTERVAL_S)
+
+@st.cache_resource
+
+def load_feedback_store():
+    return FeedbackStore(FEEDBACK_DIR)
+
+@st.cache_resource
+
+def load_remote_predictor():
+    return RemotePredictor(INFERENCE_URL)
+
+def active_model_version():
+    if INFERENCE_URL:
+        return f"remote:{load_remote_predictor().model_version()}"
+    return load_model().current.version
 
 # --------------------------------------------------
 # PAGE FUNCTION
 # --------------------------------------------------
 
 def predict_page():
+    # --------------------------------------------------
+    # INITIAL SESSION STATE
+    # --------------------------------------------------
+    if "points" not in st.session_state:
+        st.session_state.points = 0
+
+    if "last_prediction" not in st.session_state:
+        st.session_state.last_prediction = None
+
+    # Uploads already counted in the metrics for this session (reruns
+    # must not inflate the prediction distribution)
+    if "counted_uploads" not in st.session_state:
+        st.session_state.counted_uploads = set()
+
+    start_metrics_dump()
+
     st.title("♻️ EcoVision – Smart Waste Prediction")
     st.caption("AI-powered waste classification with human verification")
 
+    # TensorFlow and the model are only loaded on first use of this page
+    with st.spinner("Loading the waste classifier..."):
+        engine = None if INFERENCE_URL else load_engine()
+        prediction_cache = load_prediction_cache()
+        class_names = load_class_names()
+
+    if engine is not None:
+        current = load_model().current
+        st.caption(f"🧠 Model {current.version} · cold load {current.timings['cold_load_ms']:.0f} ms")
+
     # Disclaimer
     st.warning(
         "⚠️ **Disclaimer:** This AI model is not 100% accurate. "
@@ -71,23 +204,79 @@ def predict_page():
         st.info("👆 Upload a waste image to begin.")
         return
 
-    image = Image.open(uploaded_file).convert("RGB")
-    st.image(image, caption="Uploaded Image", use_container_width=True)
+    with metrics.timer("decode"):
+        image = Image.open(uploaded_file).convert("RGB")
+
+    with metrics.timer("render"):
+        st.image(image, caption="Uploaded Image", use_container_width=True)
 
     # --------------------------------------------------
     # MODEL PREDICTION
     # --------------------------------------------------
-    processed = preprocess_image(image)
-    preds = model.predict(processed, verbose=0)[0]
-
-    top_indices = np.argsort(preds)[::-1]
-    top1_idx, top2_idx = top_indices[:2]
-
-    top1_class = CLASS_NAMES[top1_idx]
-    top2_class = CLASS_NAMES[top2_idx]
-
-    top1_conf = float(preds[top1_idx])
-    top2_conf = float(preds[top2_idx])
+    try:
+        # Read once per run: the remote lookup is an HTTP call
+        version = active_model_version()
+    except RemoteInferenceError as exc:
+        st.error(f"❌ The classifier is unavailable right now, please try again shortly. ({exc})")
+        return
+    key = cache_key(uploaded_file.getvalue(), version)
+    preds = prediction_cache.get(key)
+
+    metrics.inc("prediction_cache_total", {"result": "miss" if preds is None else "hit"})
+
+    if preds is None:
+        if INFERENCE_URL:
+            try:
+                with metrics.timer("remote_inference"):
+                    preds = load_remote_predictor().predict(uploaded_file.getvalue())
+            except RemoteInferenceError as exc:
+                if exc.status == 429:
+                    st.error("❌ The classifier is busy, please try again in a moment.")
+                else:
+                    st.error(f"❌ The classifier is unavailable right now, please try again shortly. ({exc})")
+                return
+        else:
+            with metrics.timer("preprocess"):
+                processed = preprocess_image(image)
+            with metrics.timer("inference"):
+                preds = engine.predict(processed)
+
+            latency = load_model().predictor.last_latency_ms
+            if latency is not None:
+                st.caption(f"⏱️ Model forward pass: {latency:.1f} ms")
+
+        prediction_cache.put(key, preds)
+
+    with metrics.timer("topk"):
+        (top1_class, top1_conf), (top2_class, top2_conf) = top_k(preds, class_names, k=2)
+
+    # Only low-confidence results pay for the extra views; the averaged
+    # probabilities replace the single-view result
+    used_tta = TTA_ENABLED and engine is not None and top1_conf < CONFIDENCE_THRESHOLD
+    if used_tta:
+        tta_key = cache_key(uploaded_file.getvalue(), version + "|tta")
+        tta_preds = prediction_cache.get(tta_key)
+        if tta_preds is None:
+            tta = load_tta()
+            with metrics.timer("tta"):
+                tta_preds = tta(preprocess_image(image))
+            prediction_cache.put(tta_key, tta_preds)
+            st.caption(f"🔁 Re-checked {tta.last_views} views in {tta.last_latency_ms:.1f} ms")
+
+        preds = tta_preds
+        with metrics.timer("topk"):
+            (top1_class, top1_conf), (top2_class, top2_conf) = top_k(preds, class_names, k=2)
+
+    if key not in st.session_state.counted_uploads:
+        st.session_state.counted_uploads.add(key)
+        metrics.inc("predictions_total", {"class": top1_class})
+        if used_tta:
+            metrics.inc(
+                "tta_total",
+                {"result": "resolved" if top1_conf >= CONFIDENCE_THRESHOLD else "low_confidence"}
+            )
+        if top1_conf < CONFIDENCE_THRESHOLD:
+            metrics.inc("low_confidence_total")
 
     st.markdown("---")
     st.subheader("🧠 AI Analysis")
@@ -137,7 +326,7 @@ def predict_page():
     if feedback == "No, this is incorrect":
         final_class = st.selectbox(
             "Select the correct waste category",
-            CLASS_NAMES
+            class_names
         )
 
         corrected_bin = CLASS_TO_BIN.get(final_class, "Manual Disposal Required")
@@ -162,6 +351,23 @@ def predict_page():
     )
 
     if st.button("Confirm Action"):
+        # Feedback is final once the user confirms
+        metrics.inc(
+            "feedback_total",
+            {"result": "corrected" if feedback == "No, this is incorrect" else "confirmed"}
+        )
+
+        if feedback == "No, this is incorrect" and final_class != predicted_class:
+            load_feedback_store().record(
+                uploaded_file.getvalue(),
+                predicted_class=predicted_class,
+                corrected_class=final_class,
+                confidences={
+                    name: round(float(p), 6) for name, p in zip(class_names, preds)
+                },
+                model_version=version
+            )
+
         if action == "Throw it correctly":
             st.session_state.points += POINTS_THROW
             st.success(f"♻️ You earned {POINTS_THROW} points for proper disposal!")
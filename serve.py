@@ -0,0 +1,333 @@
+import os
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from aiohttp import web
+
+from utils.bin_rules import CLASS_TO_BIN
+from utils.inference import InferenceEngine, load_predictor, top_k
+from utils.preprocessing import preprocess_batch
+from utils.prediction_cache import model_version
+from utils.worker_pool import ModelWorkerPool
+from utils.metrics import REGISTRY as metrics
+
+# --------------------------------------------------
+# CONFIGURATION
+# --------------------------------------------------
+MODEL_PATH = "models/waste_classifier.h5"
+TFLITE_MODEL_PATH = os.environ.get(
+    "ECOVISION_TFLITE_MODEL", "models/waste_classifier_int8.tflite"
+)
+CLASS_NAMES_PATH = "class_names.json"
+MODEL_BACKEND = os.environ.get("ECOVISION_BACKEND", "keras")
+
+HOST = "0.0.0.0"
+PORT = 8000
+WORKERS = 2             # inference threads
+MAX_PENDING = 64        # in-flight images before answering 429
+MAX_BATCH_IMAGES = 32   # per /predict/batch request
+MAX_UPLOAD_MB = 10
+TOP_K = 3
+CONFIDENCE_THRESHOLD = 0.65  # same as pages/prediction.py, for metrics
+
+# Multi-process mode (see utils/worker_pool.py): 0 keeps inference in
+# this process, N > 0 dispatches decode + inference to N worker processes.
+# Only the tflite backend is supported here: keras workers would each
+# hold a private copy of the weights. "fork" shares the warmed
+# interpreter's weights, is set up before the event loop starts and runs
+# every worker single-threaded; INTRA_OP_THREADS only applies to "mmap".
+PROCESSES = 0
+INTRA_OP_THREADS = 1
+SHARE_MODE = "fork"
+
+# --------------------------------------------------
+# INFERENCE SERVICE
+# --------------------------------------------------
+class InferenceService:
+    def __init__(
+        self,
+        model_path,
+        backend,
+        class_names,
+        workers=WORKERS,
+        max_pending=MAX_PENDING,
+        processes=PROCESSES,
+        intra_op_threads=INTRA_OP_THREADS,
+        share=SHARE_MODE
+    ):
+        self.model_path = model_path
+        self.backend = backend
+        self.class_names = class_names
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+
+        self.processes = processes
+        self.pool_options = {
+            "intra_op_threads": intra_op_threads,
+            "share": share,
+        }
+
+        self.pending = 0
+        self.predictor = None
+        self.engine = None
+        self.pool = None
+        self.version = None
+
+    @property
+    def ready(self):
+        return self.engine is not None or self.pool is not None
+
+    def start_pool(self):
+        # Call from the main thread before the event loop starts when
+        # share="fork": forking a multithreaded process is unsafe
+        self.version = model_version(self.model_path)
+        self.pool = ModelWorkerPool(
+            self.model_path,
+            backend=self.backend,
+            workers=self.processes,
+            **self.pool_options
+        )
+
+    def _load(self):
+        if self.processes:
+            if self.pool is None:
+                if self.pool_options["share"] == "fork":
+                    raise RuntimeError('share="fork" pools must be started with start_pool() before serving')
+                self.start_pool()
+            return
+
+        self.version = model_version(self.model_path)
+
+        self.predictor = load_predictor(self.model_path, backend=self.backend)
+        # Single-image requests from concurrent clients share forward passes
+        self.engine = InferenceEngine(self.predictor, self.class_names)
+
+    async def load(self):
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._load)
+        except Exception as exc:
+            # Stays not ready; /readyz keeps answering 503
+            print(f"❌ Model failed to load: {type(exc).__name__}: {exc}")
+
+    def try_acquire(self, n):
+        if self.pending + n > self.max_pending:
+            return False
+        self.pending += n
+        return True
+
+    def release(self, n):
+        self.pending -= n
+
+    def _predict_many(self, blobs):
+        return self.predictor(preprocess_batch(blobs))
+
+    async def predict_one(self, data):
+        if self.pool is not None:
+            return (await asyncio.wrap_future(self.pool.submit_bytes([data])))[0]
+
+        # Decode on the pool, then await the engine without holding a
+        # worker thread, so many requests can share one batch
+        loop = asyncio.get_running_loop()
+        with metrics.timer("preprocess"):
+            image = await loop.run_in_executor(self.executor, preprocess_batch, [data])
+        with metrics.timer("inference"):
+            return await asyncio.wrap_future(self.engine.submit(image))
+
+    async def predict_many(self, blobs):
+        if self.pool is not None:
+            return await asyncio.wrap_future(self.pool.submit_bytes(blobs))
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._predict_many, blobs)
+
+    def format(self, probs, k=TOP_K):
+        with metrics.timer("topk"):
+            top = top_k(probs, self.class_names, k)
+        predicted_class, confidence = top[0]
+
+        metrics.inc("predictions_total", {"class": predicted_class})
+        if confidence < CONFIDENCE_THRESHOLD:
+            metrics.inc("low_confidence_total")
+
+        return {
+            "predicted_class": predicted_class,
+            "confidence": confidence,
+            "bin": CLASS_TO_BIN.get(predicted_class, "Manual Disposal Required"),
+            "top_k": [{"class": name, "confidence": conf} for name, conf in top],
+            "probabilities": np.asarray(probs, dtype=float).round(6).tolist(),
+            "model_version": self.version,
+        }
+
+# --------------------------------------------------
+# HANDLERS
+# --------------------------------------------------
+def _busy():
+    metrics.inc("rejected_total", {"reason": "busy"})
+    return web.json_response(
+        {"error": "Server busy, retry shortly"},
+        status=429,
+        headers={"Retry-After": "1"}
+    )
+
+
+def _not_ready():
+    return web.json_response({"error": "Model is still loading"}, status=503)
+
+
+async def _read_images(request):
+    # Multipart: every file part is an image. Otherwise the raw body is.
+    if request.content_type.startswith("multipart/"):
+        blobs = []
+        reader = await request.multipart()
+        async for part in reader:
+            if part.filename:
+                blobs.append(await part.read())
+        return blobs
+    return [await request.read()]
+
+
+async def predict(request):
+    service = request.app["service"]
+    if not service.ready:
+        return _not_ready()
+
+    blobs = await _read_images(request)
+    if len(blobs) != 1 or not blobs[0]:
+        return web.json_response({"error": "Send exactly one image"}, status=400)
+
+    if not service.try_acquire(1):
+        return _busy()
+    try:
+        with metrics.timer("request"):
+            probs = await service.predict_one(blobs[0])
+    except (OSError, ValueError) as exc:
+        return web.json_response({"error": f"Could not decode image: {exc}"}, status=400)
+    finally:
+        service.release(1)
+
+    return web.json_response(service.format(probs))
+
+
+async def predict_batch(request):
+    service = request.app["service"]
+    if not service.ready:
+        return _not_ready()
+
+    blobs = await _read_images(request)
+    if not blobs:
+        return web.json_response({"error": "No images in request"}, status=400)
+    if len(blobs) > MAX_BATCH_IMAGES:
+        return web.json_response(
+            {"error": f"At most {MAX_BATCH_IMAGES} images per batch"}, status=413
+        )
+
+    if not service.try_acquire(len(blobs)):
+        return _busy()
+    try:
+        with metrics.timer("batch_request"):
+            probs = await service.predict_many(blobs)
+    except (OSError, ValueError) as exc:
+        return web.json_response({"error": f"Could not decode image: {exc}"}, status=400)
+    finally:
+        service.release(len(blobs))
+
+    return web.json_response({"predictions": [service.format(p) for p in probs]})
+
+
+async def metrics_endpoint(request):
+    # Prometheus text exposition; empty unless ECOVISION_METRICS=1
+    return web.Response(
+        text=metrics.render_prometheus(),
+        content_type="text/plain",
+        headers={"X-Metrics-Enabled": str(metrics.enabled).lower()}
+    )
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok"})
+
+
+async def readyz(request):
+    service = request.app["service"]
+    if not service.ready:
+        return _not_ready()
+    return web.json_response({
+        "status": "ready",
+        "backend": service.backend,
+        "model_version": service.version,
+        "pending": service.pending,
+    })
+
+# --------------------------------------------------
+# APP
+# --------------------------------------------------
+def create_app(service):
+    app = web.Application(client_max_size=MAX_UPLOAD_MB * 1024 * 1024)
+    app["service"] = service
+
+    async def on_startup(app):
+        # Load in the background so /healthz answers immediately
+        app["loader"] = asyncio.create_task(service.load())
+
+    async def on_cleanup(app):
+        service.executor.shutdown(wait=False)
+        if service.pool is not None:
+            service.pool.close()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    app.router.add_post("/predict", predict)
+    app.router.add_post("/predict/batch", predict_batch)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    app.router.add_get("/metrics", metrics_endpoint)
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="EcoVision HTTP inference service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--model", help=f"Default: {MODEL_PATH} (keras) or {TFLITE_MODEL_PATH} (tflite)")
+    parser.add_argument("--backend", default=MODEL_BACKEND, choices=["keras", "tflite"])
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+    parser.add_argument("--processes", type=int, default=PROCESSES)
+    parser.add_argument(
+        "--intra-op-threads", type=int, default=INTRA_OP_THREADS,
+        help='Interpreter threads per worker process (--share mmap only; forked workers run single-threaded)'
+    )
+    parser.add_argument("--share", default=SHARE_MODE, choices=["mmap", "fork"])
+    args = parser.parse_args(argv)
+
+    if args.model is None:
+        args.model = TFLITE_MODEL_PATH if args.backend == "tflite" else MODEL_PATH
+    if args.processes and args.backend != "tflite":
+        parser.error("--processes requires --backend tflite (keras workers cannot share weights)")
+    if args.processes and args.share == "fork" and args.intra_op_threads != 1:
+        parser.error("--intra-op-threads only applies with --share mmap; forked workers run single-threaded")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    with open(CLASS_NAMES_PATH) as f:
+        class_names = json.load(f)
+
+    service = InferenceService(
+        args.model,
+        args.backend,
+        class_names,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        processes=args.processes,
+        intra_op_threads=args.intra_op_threads,
+        share=args.share
+    )
+    if args.processes:
+        # Before the event loop and any threads exist (required for fork)
+        service.start_pool()
+    web.run_app(create_app(service), host=args.host, port=args.port)
@@ -0,0 +1,206 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from model_builder import build_model
+
+from utils.bin_rules import CLASS_TO_BIN
+from utils.inference import CompiledPredictor, top_k
+from utils.preprocessing import preprocess_image
+
+CLASS_NAMES_PATH = "class_names.json"
+BATCH_SIZES = [1, 2, 4, 8, 16, 32, 64]
+RUNS = 30
+WARMUP_RUNS = 3
+UPLOAD_SIZE = (1024, 768)  # typical phone photo after browser downscale
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_MODULES = [
+    "pages.home",
+    "pages.how_it_works",
+    "pages.prediction",
+    "pages.donate_sell",
+    "pages.rewards",
+    "pages.about",
+]
+
+# Runs in a fresh interpreter so each measurement starts cold
+STARTUP_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - start) * 1000,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "tensorflow_loaded": "tensorflow" in sys.modules,
+}}))
+"""
+
+# ---------------- HELPERS ---------------- #
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def latency_stats(samples_ms, images_per_call=1):
+    arr = np.asarray(samples_ms)
+    return {
+        "runs": int(arr.size),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "images_per_sec": 1000 * images_per_call / float(arr.mean()),
+    }
+
+
+def time_calls(fn, runs=RUNS, warmup=WARMUP_RUNS):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def synthetic_upload(seed=0, size=UPLOAD_SIZE):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def load_class_names():
+    if os.path.exists(CLASS_NAMES_PATH):
+        with open(CLASS_NAMES_PATH) as f:
+            return json.load(f)
+    return sorted(CLASS_TO_BIN)
+
+# ---------------- BENCHMARKS ---------------- #
+
+def bench_cold_load(model, class_names, workdir):
+    # Save the random model the same way train.py does, then time a
+    # fresh load of the .h5 plus class_names.json
+    model_path = os.path.join(workdir, "waste_classifier.h5")
+    names_path = os.path.join(workdir, "class_names.json")
+    model.save(model_path)
+    with open(names_path, "w") as f:
+        json.dump(class_names, f)
+
+    def load():
+        tf.keras.backend.clear_session()
+        tf.keras.models.load_model(model_path)
+        with open(names_path) as f:
+            json.load(f)
+
+    return latency_stats(time_calls(load, runs=3, warmup=0))
+
+
+def bench_startup():
+    # What a visitor pays before the first page renders: each page module
+    # on its own (lazy router) vs every page up front (eager imports)
+    def probe(modules):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE.format(modules=modules)],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    results = {module: probe([module]) for module in PAGE_MODULES}
+    results["all_pages_eager"] = probe(PAGE_MODULES)
+    return results
+
+
+def run(args):
+    results = {
+        "tensorflow": tf.__version__,
+        "cpu_count": os.cpu_count(),
+        "rss_at_start_mb": peak_rss_mb(),
+    }
+
+    class_names = load_class_names()
+    upload = synthetic_upload()
+    image = Image.open(io.BytesIO(upload)).convert("RGB")
+
+    # 1) Preprocessing alone
+    results["preprocess_image"] = latency_stats(
+        time_calls(lambda: preprocess_image(image), args.runs)
+    )
+
+    # Same architecture as train.py, random weights: no dataset or
+    # downloaded ImageNet weights needed
+    model, _ = build_model(len(class_names), weights=None)
+    predictor = CompiledPredictor(model)
+    single = preprocess_image(image)
+
+    # 2) Single-image model calls
+    results["single_image"] = {
+        "model.predict": latency_stats(
+            time_calls(lambda: model.predict(single, verbose=0), args.runs)
+        ),
+        "compiled": latency_stats(time_calls(lambda: predictor(single), args.runs)),
+    }
+
+    # 3) Batch-size sweep
+    results["batch_sizes"] = {}
+    for batch_size in args.batch_sizes:
+        batch = np.repeat(single, batch_size, axis=0)
+        results["batch_sizes"][str(batch_size)] = latency_stats(
+            time_calls(lambda: predictor(batch), args.runs),
+            images_per_call=batch_size
+        )
+
+    # 4) End-to-end: uploaded bytes -> recommended bin
+    def end_to_end():
+        img = Image.open(io.BytesIO(upload)).convert("RGB")
+        probs = predictor(preprocess_image(img))[0]
+        name, _ = top_k(probs, class_names, 1)[0]
+        return CLASS_TO_BIN.get(name, "Manual Disposal Required")
+
+    results["end_to_end"] = latency_stats(time_calls(end_to_end, args.runs))
+
+    # 5) Cold load (last: it clears the Keras session)
+    with tempfile.TemporaryDirectory() as workdir:
+        results["cold_load"] = bench_cold_load(model, class_names, workdir)
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline inference latency/throughput benchmark (synthetic images, random weights)."
+    )
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--startup", action="store_true", help="Only measure per-page import time and memory")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = {"startup": bench_startup()} if args.startup else run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
@@ -0,0 +1,298 @@
+import os
+import csv
+import json
+import time
+import argparse
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from utils.append_log import truncate_torn_line
+from utils.bin_rules import CLASS_TO_BIN
+from utils.inference import load_predictor, top_k
+from utils.preprocessing import IMAGE_SIZE, preprocess_batch
+
+MODEL_PATH = "models/waste_classifier.h5"
+CLASS_NAMES_PATH = "class_names.json"
+
+BATCH_SIZE = 64
+TOP_K = 3
+LOG_EVERY = 20  # batches
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
+
+# ---------------- SOURCES ---------------- #
+
+def _is_image(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_directory(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if _is_image(name):
+                path = os.path.join(dirpath, name)
+                yield os.path.relpath(path, root), lambda p=path: open(p, "rb").read()
+
+
+def iter_tar(path):
+    # Members are read sequentially here; decoding happens on the pool
+    with tarfile.open(path) as archive:
+        for member in archive:
+            if member.isfile() and _is_image(member.name):
+                data = archive.extractfile(member).read()
+                yield member.name, lambda d=data: d
+
+
+def iter_zip(path):
+    with zipfile.ZipFile(path) as archive:
+        for name in archive.namelist():
+            if _is_image(name) and not name.endswith("/"):
+                data = archive.read(name)
+                yield name, lambda d=data: d
+
+
+def iter_file_list(path):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line, lambda p=line: open(p, "rb").read()
+
+
+def iter_source(source):
+    if os.path.isdir(source):
+        return iter_directory(source)
+    if tarfile.is_tarfile(source):
+        return iter_tar(source)
+    if zipfile.is_zipfile(source):
+        return iter_zip(source)
+    return iter_file_list(source)
+
+# ---------------- WRITERS ---------------- #
+
+class CSVWriter:
+    def __init__(self, path, fieldnames):
+        truncate_torn_line(path)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a", newline="")
+        self.writer = csv.DictWriter(self.f, fieldnames=fieldnames)
+        if new_file:
+            self.writer.writeheader()
+
+    @staticmethod
+    def done_ids(path):
+        if not os.path.exists(path):
+            return set()
+        truncate_torn_line(path)
+        with open(path, newline="") as f:
+            # Rows missing trailing fields were not fully written
+            return {row["id"] for row in csv.DictReader(f) if None not in row.values()}
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class JSONLWriter:
+    def __init__(self, path, fieldnames):
+        truncate_torn_line(path)
+        self.f = open(path, "a")
+
+    @staticmethod
+    def done_ids(path):
+        if not os.path.exists(path):
+            return set()
+        truncate_torn_line(path)
+        ids = set()
+        with open(path) as f:
+            for line in f:
+                try:
+                    ids.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    continue
+        return ids
+
+    def write(self, rows):
+        for row in rows:
+            self.f.write(json.dumps(row) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class ParquetWriter:
+    # Parquet files cannot be appended to, so each flush is a new part
+    # file inside the output directory
+    def __init__(self, path, fieldnames):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.part = len([n for n in os.listdir(path) if n.endswith(".parquet")])
+
+    @staticmethod
+    def done_ids(path):
+        if not os.path.isdir(path):
+            return set()
+        import pandas as pd
+        ids = set()
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".parquet"):
+                ids.update(pd.read_parquet(os.path.join(path, name), columns=["id"])["id"])
+        return ids
+
+    def write(self, rows):
+        import pandas as pd
+        tmp = os.path.join(self.path, f"part-{self.part:05d}.parquet.tmp")
+        pd.DataFrame(rows).to_parquet(tmp, index=False)
+        os.replace(tmp, tmp[:-len(".tmp")])
+        self.part += 1
+
+    def close(self):
+        pass
+
+
+WRITERS = {"csv": CSVWriter, "jsonl": JSONLWriter, "parquet": ParquetWriter}
+
+
+def infer_format(output):
+    ext = os.path.splitext(output)[1].lstrip(".").lower()
+    return ext if ext in WRITERS else "csv"
+
+# ---------------- CLASSIFICATION ---------------- #
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def decode_batch(batch, pool, buffer, draft):
+    # Submits every decode now and returns an iterator of per-image errors
+    # (None on success), so the pool can work while the model runs
+    _, readers = zip(*batch)
+
+    def decode(i):
+        try:
+            preprocess_batch([readers[i]()], draft=draft, out=buffer[i:i + 1])
+            return None
+        except Exception as exc:
+            # One line, so a CSV row never spans a torn-line cut
+            return f"{type(exc).__name__}: {exc}".replace("\n", " ")
+
+    return pool.map(decode, range(len(batch)))
+
+
+def classify_batch(batch, decoding, predictor, buffer, class_names, k):
+    ids, _ = zip(*batch)
+    errors = list(decoding)
+    ok = [i for i, err in enumerate(errors) if err is None]
+
+    rows = []
+    probs = predictor(buffer[ok]) if ok else []
+    by_index = dict(zip(ok, probs))
+
+    for i, image_id in enumerate(ids):
+        row = {"id": image_id, "error": errors[i] or ""}
+        top = top_k(by_index[i], class_names, k) if i in by_index else []
+        for rank in range(k):
+            name, conf = top[rank] if rank < len(top) else ("", None)
+            row[f"top{rank + 1}_class"] = name
+            row[f"top{rank + 1}_conf"] = conf
+        row["bin"] = CLASS_TO_BIN.get(top[0][0], "Manual Disposal Required") if top else ""
+        rows.append(row)
+
+    return rows
+
+
+def run(args):
+    with open(args.class_names) as f:
+        class_names = json.load(f)
+
+    fmt = args.format or infer_format(args.output)
+    writer_cls = WRITERS[fmt]
+    fieldnames = ["id", "error"]
+    for rank in range(1, args.top_k + 1):
+        fieldnames += [f"top{rank}_class", f"top{rank}_conf"]
+    fieldnames.append("bin")
+
+    done = writer_cls.done_ids(args.output)
+    if done:
+        print(f"⏩ Resuming: {len(done)} images already in {args.output}")
+
+    predictor = load_predictor(args.model, backend=args.backend)
+    writer = writer_cls(args.output, fieldnames)
+    # Two buffers: the pool decodes the next batch into one while the
+    # model runs on the other
+    buffers = [np.empty((args.batch_size, *IMAGE_SIZE, 3), dtype=np.float32) for _ in range(2)]
+
+    pending = ((i, r) for i, r in iter_source(args.source) if i not in done)
+    processed = failed = 0
+    start = time.perf_counter()
+
+    def flush(batch, decoding, buffer):
+        nonlocal processed, failed
+        rows = classify_batch(batch, decoding, predictor, buffer, class_names, args.top_k)
+        writer.write(rows)
+        processed += len(rows)
+        failed += sum(1 for row in rows if row["error"])
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            previous = None
+            for n, batch in enumerate(_batched(pending, args.batch_size), 1):
+                buffer = buffers[n % 2]
+                current = (batch, decode_batch(batch, pool, buffer, args.draft), buffer)
+                if previous is not None:
+                    flush(*previous)
+                previous = current
+
+                if n % LOG_EVERY == 0:
+                    rate = processed / (time.perf_counter() - start)
+                    print(f"🔄 {processed} images | {rate:.1f} img/s")
+
+            if previous is not None:
+                flush(*previous)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print("\n📊 Bulk classification summary")
+    print(f"   processed : {processed}")
+    print(f"   skipped   : {len(done)} (already done)")
+    print(f"   failed    : {failed}")
+    print(f"   elapsed   : {elapsed:.1f} s")
+    print(f"   throughput: {processed / max(elapsed, 1e-9):.1f} img/s")
+    print(f"\n✅ Predictions written to {args.output}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Classify a folder, tar/zip archive or image list offline."
+    )
+    parser.add_argument("source", help="Directory, .tar/.zip archive or newline-delimited file list")
+    parser.add_argument("output", help="Output .csv, .jsonl or .parquet (directory of parts)")
+    parser.add_argument("--format", choices=sorted(WRITERS))
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default="keras", choices=["keras", "tflite"])
+    parser.add_argument("--class-names", default=CLASS_NAMES_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--draft", action="store_true", help="Use JPEG draft mode to downscale while decoding")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,204 @@
+import os
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
+from data_loader import (
+    get_datasets,
+    build_augmentation,
+    list_image_files,
+    listing_fingerprint,
+    read_split_manifest,
+    manifest_listing,
+    CACHE_FORMAT
+)
+
+EMBEDDINGS_PATH = "models/embeddings.npz"
+BATCH_SIZE = 32
+
+# ---------------- EXTRACTION ---------------- #
+
+def extract_embeddings(feature_model, ds, augmentation=None):
+    # `ds` yields raw (0-255) image batches; the frozen backbone runs once
+    features = []
+    labels = []
+
+    for images, y in ds:
+        if augmentation is not None:
+            images = augmentation(images, training=True)
+        feats = feature_model(preprocess_input(images), training=False)
+        # Stored as float32 even when a mixed-precision policy is active
+        features.append(tf.cast(feats, tf.float32).numpy())
+        labels.append(y.numpy())
+
+    return np.concatenate(features), np.concatenate(labels)
+
+
+def build_embedding_store(
+    feature_model,
+    train_ds,
+    val_ds,
+    augmentation=None,
+    variants=0,
+    fingerprint="",
+    path=EMBEDDINGS_PATH
+):
+    # The clean training pass plus `variants` augmented passes
+    print("\n🧬 Extracting backbone embeddings...")
+    x_parts, y_parts = [], []
+
+    x, y = extract_embeddings(feature_model, train_ds)
+    x_parts.append(x)
+    y_parts.append(y)
+
+    for i in range(variants):
+        print(f"🧬 Augmented variant {i + 1}/{variants}")
+        tf.random.set_seed(i)
+        x, y = extract_embeddings(feature_model, train_ds, augmentation)
+        x_parts.append(x)
+        y_parts.append(y)
+
+    x_val, y_val = extract_embeddings(feature_model, val_ds)
+
+    store = {
+        "x_train": np.concatenate(x_parts),
+        "y_train": np.concatenate(y_parts),
+        "x_val": x_val,
+        "y_val": y_val,
+        "fingerprint": np.array(fingerprint),
+    }
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, **store)
+    print(f"✅ Embeddings saved to {path} ({len(store['x_train'])} train vectors)")
+    return store
+
+
+def load_embedding_store(path=EMBEDDINGS_PATH, fingerprint=None):
+    # Returns None when missing or built from a different dataset/config
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        store = {key: data[key] for key in data.files}
+    if fingerprint is not None and str(store["fingerprint"]) != fingerprint:
+        return None
+    return store
+
+def embedding_fingerprint(dataset_dir, image_size, variants, seed, cache_dir=None, split_manifest=None):
+    # Everything that changes the stored vectors. With a manifest the
+    # file list comes from it, without walking the dataset directory
+    if split_manifest is not None:
+        file_paths = manifest_listing(read_split_manifest(split_manifest))[0]
+    else:
+        file_paths = list_image_files(dataset_dir)[0]
+    return "|".join([
+        listing_fingerprint(file_paths, image_size),
+        f"variants={variants}",
+        f"seed={seed}",
+        f"cache={cache_dir and f'{cache_dir}:{CACHE_FORMAT}'}",
+        f"split={listing_fingerprint([split_manifest], ()) if split_manifest else None}",
+    ])
+
+
+def ensure_embedding_store(
+    feature_model,
+    dataset_dir,
+    image_size,
+    batch_size=BATCH_SIZE,
+    seed=42,
+    variants=0,
+    cache_dir=None,
+    split_manifest=None,
+    path=EMBEDDINGS_PATH
+):
+    # Reuses the store at `path` when it matches, else extracts a new one
+    fingerprint = embedding_fingerprint(dataset_dir, image_size, variants, seed, cache_dir, split_manifest)
+    store = load_embedding_store(path, fingerprint)
+    if store is not None:
+        return store
+
+    # Raw 0-255 batches; extraction applies preprocessing itself
+    train_ds, val_ds, _ = get_datasets(
+        dataset_dir,
+        batch_size=batch_size,
+        seed=seed,
+        image_size=image_size,
+        cache_dir=cache_dir,
+        split_manifest=split_manifest,
+        preprocess=False,
+        shuffle_buffer=0
+    )
+    return build_embedding_store(
+        feature_model,
+        train_ds,
+        val_ds,
+        augmentation=build_augmentation(),
+        variants=variants,
+        fingerprint=fingerprint,
+        path=path
+    )
+
+# ---------------- HEAD TRAINING ---------------- #
+
+def _memmap_dataset(x, y, batch_size, seed=None):
+    # Batches gathered from the memmap on the fly; from_tensor_slices
+    # would copy the whole array into this process
+    def take(idx):
+        return x[idx], y[idx]
+
+    def gather(idx):
+        xb, yb = tf.numpy_function(take, [idx], (tf.as_dtype(x.dtype), tf.as_dtype(y.dtype)))
+        xb.set_shape((None, *x.shape[1:]))
+        yb.set_shape((None,))
+        return xb, yb
+
+    ds = tf.data.Dataset.range(len(y))
+    if seed is not None:
+        ds = ds.shuffle(len(y), seed=seed)
+    return ds.batch(batch_size).map(gather).prefetch(tf.data.AUTOTUNE)
+
+
+def embedding_datasets(store, batch_size=BATCH_SIZE, seed=42):
+    if isinstance(store["x_train"], np.memmap):
+        return (
+            _memmap_dataset(store["x_train"], store["y_train"], batch_size, seed),
+            _memmap_dataset(store["x_val"], store["y_val"], batch_size)
+        )
+
+    train_ds = (
+        tf.data.Dataset.from_tensor_slices((store["x_train"], store["y_train"]))
+        .shuffle(len(store["y_train"]), seed=seed)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    val_ds = (
+        tf.data.Dataset.from_tensor_slices((store["x_val"], store["y_val"]))
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+    return train_ds, val_ds
+
+
+def train_head(
+    head,
+    store,
+    epochs,
+    class_weight=None,
+    batch_size=BATCH_SIZE,
+    learning_rate=1e-4,
+    callbacks=None,
+    **compile_kwargs
+):
+    head.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate),
+        loss=tf.keras.losses.SparseCategoricalCrossentropy(),
+        metrics=["accuracy"],
+        **compile_kwargs
+    )
+    train_ds, val_ds = embedding_datasets(store, batch_size)
+    return head.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=epochs,
+        class_weight=class_weight,
+        callbacks=callbacks
+    )
@@ -1,36 +1,237 @@
-import tensorflow as tf
+import os
 import numpy as np
 import json
-from sklearn.metrics import classification_report, confusion_matrix
-from data_loader import get_datasets
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from data_loader import get_datasets, get_subset_dataset
+
+from utils.inference import load_predictor, compare_with_predict
+from utils.model_registry import resolve_version, load_version, version_id, update_metrics, REGISTRY_DIR
+from utils.tta import TestTimeAugmentation, MAX_VIEWS, LATENCY_BUDGET_MS
 
 DATASET_DIR = "dataset"
+MODEL_VERSION = "latest"  # registry version; MODEL_PATH if the registry is empty
 MODEL_PATH = "models/waste_classifier.h5"
+CLASS_NAMES_PATH = "class_names.json"
+REPORT_PATH = "models/eval_report.json"
 BATCH_SIZE = 32
 
-# Load trained model
-model = tf.keras.models.load_model(MODEL_PATH)
+# With a split manifest (src/split_manifest.py), evaluate on its held-out
+# "test" split; otherwise on the seeded validation split
+SPLIT_MANIFEST = None
+EVAL_SUBSET = "test"
+
+# Also measure test-time augmentation on low-confidence samples, with
+# the prediction page's threshold and latency budget
+EVAL_TTA = True
+CONFIDENCE_THRESHOLD = 0.65
+TTA_MAX_VIEWS = MAX_VIEWS
+TTA_LATENCY_BUDGET_MS = LATENCY_BUDGET_MS
+
+# ---------------- STREAMING METRICS ---------------- #
+
+class StreamingEvaluator:
+    """
+    Accumulates a fixed-size confusion matrix and top-k hits batch by
+    batch, so memory stays O(num_classes^2) however large the set is.
+    """
+
+    def __init__(self, num_classes, k=2):
+        self.num_classes = num_classes
+        self.k = k
+        self.confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+        self.topk_hits = 0
+        self.total = 0
+
+    def update(self, labels, probs):
+        labels = np.asarray(labels, dtype=np.int64)
+        probs = np.asarray(probs)
+        preds = np.argmax(probs, axis=1)
+
+        self.confusion += np.bincount(
+            labels * self.num_classes + preds,
+            minlength=self.num_classes ** 2
+        ).reshape(self.num_classes, self.num_classes)
+
+        topk = np.argpartition(probs, -self.k, axis=1)[:, -self.k:]
+        self.topk_hits += int(np.sum(np.any(topk == labels[:, None], axis=1)))
+        self.total += len(labels)
+
+    def report(self, class_names):
+        tp = np.diag(self.confusion).astype(np.float64)
+        predicted = self.confusion.sum(axis=0)
+        support = self.confusion.sum(axis=1)
+
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+
+        return {
+            "samples": self.total,
+            "accuracy": float(tp.sum() / max(self.total, 1)),
+            f"top{self.k}_accuracy": self.topk_hits / max(self.total, 1),
+            "macro_f1": float(f1.mean()),
+            "per_class": {
+                name: {
+                    "precision": float(precision[i]),
+                    "recall": float(recall[i]),
+                    "f1": float(f1[i]),
+                    "support": int(support[i]),
+                }
+                for i, name in enumerate(class_names)
+            },
+            "confusion_matrix": self.confusion.tolist(),
+        }
+
+
+def evaluate_dataset(predict_fn, ds, class_names, k=2, tta=None, threshold=0.65):
+    # With `tta`, samples below `threshold` are re-predicted from their
+    # augmented views, as on the prediction page, and the report gains a
+    # "tta" section comparing the two
+    evaluator = StreamingEvaluator(len(class_names), k)
+    tta_evaluator = StreamingEvaluator(len(class_names), k) if tta is not None else None
+    low_before = low_after = low_correct_before = low_correct_after = 0
+    views = []
+
+    for images, labels in ds:
+        labels = labels.numpy()
+        probs = np.asarray(predict_fn(images))
+        evaluator.update(labels, probs)
+        if tta is None:
+            continue
+
+        images = np.asarray(images)
+        low = np.flatnonzero(probs.max(axis=1) < threshold)
+        probs = probs.copy()
+        for i in low:
+            low_correct_before += int(np.argmax(probs[i]) == labels[i])
+            probs[i] = tta(images[i])
+            views.append(tta.last_views)
+            low_correct_after += int(np.argmax(probs[i]) == labels[i])
+        low_before += len(low)
+        low_after += int(np.sum(probs[low].max(axis=1) < threshold))
+        tta_evaluator.update(labels, probs)
+
+    report = evaluator.report(class_names)
+    if tta is None:
+        return report
+
+    total = max(report["samples"], 1)
+    after = tta_evaluator.report(class_names)
+    report["tta"] = {
+        "threshold": threshold,
+        "low_confidence_samples": low_before,
+        "fallback_rate_before": low_before / total,
+        "fallback_rate_after": low_after / total,
+        "fallback_reduction": (low_before - low_after) / max(low_before, 1),
+        "low_confidence_accuracy_before": low_correct_before / max(low_before, 1),
+        "low_confidence_accuracy_after": low_correct_after / max(low_before, 1),
+        "accuracy_after": after["accuracy"],
+        "macro_f1_after": after["macro_f1"],
+        "mean_views": float(np.mean(views)) if views else 0.0,
+        "latency": tta.latency_summary(),
+    }
+    return report
+
+
+def print_report(report, class_names):
+    print(f"{'':>24} precision    recall  f1-score   support\n")
+    for name in class_names:
+        row = report["per_class"][name]
+        print(
+            f"{name:>24} {row['precision']:>9.2f} {row['recall']:>9.2f} "
+            f"{row['f1']:>9.2f} {row['support']:>9d}"
+        )
+    print()
+    print(f"{'accuracy':>24} {report['accuracy']:>29.4f} {report['samples']:>9d}")
+    print(f"{'top-2 accuracy':>24} {report['top2_accuracy']:>29.4f}")
+    print(f"{'macro f1':>24} {report['macro_f1']:>29.4f}")
+
+
+def print_tta_report(tta):
+    latency = tta["latency"]
+    print(f"{'fallback rate':>24} {tta['fallback_rate_before']:>9.2%} → {tta['fallback_rate_after']:.2%} "
+          f"({tta['fallback_reduction']:.1%} of {tta['low_confidence_samples']} resolved)")
+    print(f"{'low-conf accuracy':>24} {tta['low_confidence_accuracy_before']:>9.4f} → "
+          f"{tta['low_confidence_accuracy_after']:.4f}")
+    print(f"{'accuracy with TTA':>24} {tta['accuracy_after']:>9.4f}")
+    if latency["calls"]:
+        print(f"{'TTA cost':>24} {latency['mean_ms']:>9.1f} ms mean | p95 {latency['p95_ms']:.1f} ms | "
+              f"{tta['mean_views']:.1f} views")
+
+
+if __name__ == "__main__":
+    # Load trained model (compiled fast path, warmed up)
+    entry = resolve_version(MODEL_VERSION, REGISTRY_DIR)
+    if entry is not None:
+        predictor, load_timings = load_version(entry)
+        print(f"🧠 {version_id(entry)} | cold load {load_timings['cold_load_ms']:.0f} ms")
+    else:
+        predictor, load_timings = load_predictor(MODEL_PATH), None
+
+    # Load evaluation dataset ONLY
+    if SPLIT_MANIFEST:
+        val_ds, class_names = get_subset_dataset(
+            SPLIT_MANIFEST,
+            EVAL_SUBSET,
+            DATASET_DIR,
+            batch_size=BATCH_SIZE
+        )
+    else:
+        _, val_ds, class_names = get_datasets(
+            DATASET_DIR,
+            batch_size=BATCH_SIZE
+        )
+
+    # The model's output order is defined by the saved class names
+    if entry is not None:
+        assert entry["class_names"] == class_names, f"{entry['version']} class names do not match dataset folders"
+    else:
+        with open(CLASS_NAMES_PATH) as f:
+            assert json.load(f) == class_names, "class_names.json does not match dataset folders"
+
+    tta = None
+    if EVAL_TTA:
+        tta = TestTimeAugmentation(
+            predictor,
+            max_views=TTA_MAX_VIEWS,
+            latency_budget_ms=TTA_LATENCY_BUDGET_MS
+        )
+
+    report = evaluate_dataset(
+        predictor, val_ds, class_names, k=2, tta=tta, threshold=CONFIDENCE_THRESHOLD
+    )
+    report["latency"] = compare_with_predict(predictor)
+    report["model_version"] = version_id(entry) if entry is not None else MODEL_PATH
+    report["cold_load"] = load_timings
 
-# Load validation dataset ONLY
-_, val_ds, class_names = get_datasets(
-    DATASET_DIR,
-    batch_size=BATCH_SIZE
-)
+    if entry is not None:
+        # Summary only; the full report stays in REPORT_PATH
+        update_metrics(entry, {
+            "eval": {
+                "subset": EVAL_SUBSET if SPLIT_MANIFEST else "val",
+                "samples": report["samples"],
+                "accuracy": report["accuracy"],
+                "top2_accuracy": report["top2_accuracy"],
+                "macro_f1": report["macro_f1"],
+                "tta_fallback_reduction": report.get("tta", {}).get("fallback_reduction"),
+            }
+        })
 
-# Optional safety: load saved class names instead
-# with open("class_names.json") as f:
-#     class_names = json.load(f)
+    print("\n📊 Classification Report\n")
+    print_report(report, class_names)
 
-y_true = []
-y_pred = []
+    if "tta" in report:
+        print("\n🔁 Test-time augmentation (low-confidence samples)\n")
+        print_tta_report(report["tta"])
 
-for images, labels in val_ds:
-    predictions = model.predict(images, verbose=0)
-    y_true.extend(labels.numpy())
-    y_pred.extend(np.argmax(predictions, axis=1))
+    print("\n🧩 Confusion Matrix\n")
+    print(np.array(report["confusion_matrix"]))
 
-print("\n📊 Classification Report\n")
-print(classification_report(y_true, y_pred, target_names=class_names))
+    print("\n⏱️ Per-call latency (batch of 1)\n")
+    for path, stats in report["latency"].items():
+        print(f"{path:>14}: mean {stats['mean_ms']:.1f} ms | p50 {stats['p50_ms']:.1f} ms | p95 {stats['p95_ms']:.1f} ms")
 
-print("\n🧩 Confusion Matrix\n")
-print(confusion_matrix(y_true, y_pred))
\ No newline at end of file
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Report saved to {REPORT_PATH}")
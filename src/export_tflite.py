@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import numpy as np
+import tensorflow as tf
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from data_loader import get_datasets
+
+from utils.inference import TFLitePredictor
+
+DATASET_DIR = "dataset"
+MODEL_PATH = "models/waste_classifier.h5"
+FLOAT16_PATH = "models/waste_classifier_fp16.tflite"
+INT8_PATH = "models/waste_classifier_int8.tflite"
+REPORT_PATH = "models/tflite_report.json"
+
+BATCH_SIZE = 32
+CALIBRATION_SAMPLES = 300
+
+# ---------------- CONVERSION ---------------- #
+
+def representative_dataset(train_ds, num_samples=CALIBRATION_SAMPLES):
+    # Calibration images already carry MobileNetV2 preprocessing
+    def gen():
+        seen = 0
+        for images, _ in train_ds:
+            for image in images:
+                yield [tf.expand_dims(image, 0)]
+                seen += 1
+                if seen >= num_samples:
+                    return
+    return gen
+
+
+def export_float16(model):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    return converter.convert()
+
+
+def export_int8(model, train_ds, num_samples=CALIBRATION_SAMPLES):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(train_ds, num_samples)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+# ---------------- ACCURACY DELTA ---------------- #
+
+def evaluate_predictor(predict_fn, val_ds):
+    correct = 0
+    total = 0
+    elapsed = 0.0
+
+    for images, labels in val_ds:
+        start = time.perf_counter()
+        probs = predict_fn(images.numpy())
+        elapsed += time.perf_counter() - start
+
+        correct += int(np.sum(np.argmax(probs, axis=1) == labels.numpy()))
+        total += len(labels)
+
+    return {
+        "accuracy": correct / max(total, 1),
+        "ms_per_image": 1000 * elapsed / max(total, 1),
+        "images": total,
+    }
+
+
+def export_all(model=None, dataset_dir=DATASET_DIR, split_manifest=None, cache_dir=None):
+    if model is None:
+        model = tf.keras.models.load_model(MODEL_PATH)
+
+    # Same split as training, so the accuracy report never scores
+    # training images
+    train_ds, val_ds, _ = get_datasets(
+        dataset_dir,
+        batch_size=BATCH_SIZE,
+        cache_dir=cache_dir,
+        split_manifest=split_manifest
+    )
+
+    print("\n📦 Exporting float16 TFLite model...")
+    with open(FLOAT16_PATH, "wb") as f:
+        f.write(export_float16(model))
+
+    print(f"📦 Exporting full-integer TFLite model ({CALIBRATION_SAMPLES} calibration images)...")
+    with open(INT8_PATH, "wb") as f:
+        f.write(export_int8(model, train_ds))
+
+    print("\n📊 Comparing against the Keras model on the validation split...")
+    report = {
+        "keras": evaluate_predictor(
+            lambda x: model(x, training=False).numpy(), val_ds
+        )
+    }
+    report["keras"]["size_mb"] = os.path.getsize(MODEL_PATH) / 1e6 if os.path.exists(MODEL_PATH) else None
+
+    for name, path in [("float16", FLOAT16_PATH), ("int8", INT8_PATH)]:
+        predictor = TFLitePredictor(path)
+        stats = evaluate_predictor(predictor, val_ds)
+        stats["size_mb"] = os.path.getsize(path) / 1e6
+        stats["accuracy_delta"] = stats["accuracy"] - report["keras"]["accuracy"]
+        report[name] = stats
+
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, stats in report.items():
+        delta = stats.get("accuracy_delta", 0.0)
+        print(
+            f"{name:>8}: acc {stats['accuracy']:.4f} ({delta:+.4f}) | "
+            f"{stats['ms_per_image']:.2f} ms/img | "
+            f"{stats['size_mb'] or 0:.1f} MB"
+        )
+
+    print(f"\n✅ TFLite models and report saved to {REPORT_PATH}")
+    return report
+
+
+if __name__ == "__main__":
+    export_all()
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from data_loader import list_image_files, split_file_listing, read_split_manifest, manifest_listing
+from model_builder import build_feature_extractor, extract_head, transfer_head_weights
+
+from utils.feedback_store import FeedbackStore, FEEDBACK_DIR
+from utils.preprocessing import preprocess_batch
+
+DATASET_DIR = "dataset"
+MODEL_PATH = "models/waste_classifier.h5"
+OUTPUT_PATH = "models/waste_classifier_feedback.h5"
+CLASS_NAMES_PATH = "class_names.json"
+SPLIT_MANIFEST = None  # match train.py when it trains from a split manifest
+REPORT_PATH = "models/feedback_finetune_report.json"
+
+BATCH_SIZE = 32
+EPOCHS = 10
+LEARNING_RATE = 1e-4
+SEED = 42
+
+MIN_CORRECTIONS = 10
+REPLAY_RATIO = 4            # replay images per correction
+MAX_REPLAY = 2000
+REPLAY_EVAL_FRACTION = 0.2  # held-out replay images to catch forgetting
+CORRECTION_WEIGHT = 2.0
+MAX_REPLAY_ACC_DROP = 0.02  # refuse to save if old-data accuracy drops more
+
+# ---------------- DATA ---------------- #
+
+def embed_files(feature_model, paths, batch_size=BATCH_SIZE):
+    # Decode with the same preprocessing as serving, then run the frozen
+    # backbone once; the head is trained on the vectors
+    features = []
+    for i in range(0, len(paths), batch_size):
+        blobs = []
+        for path in paths[i:i + batch_size]:
+            with open(path, "rb") as f:
+                blobs.append(f.read())
+        feats = feature_model(preprocess_batch(blobs), training=False)
+        features.append(tf.cast(feats, tf.float32).numpy())
+    return np.concatenate(features) if features else np.zeros((0, 1280), np.float32)
+
+
+def replay_sample(dataset_dir, num_samples, seed=SEED, split_manifest=SPLIT_MANIFEST):
+    # Only training-split images, so validation numbers stay honest
+    if split_manifest is not None:
+        train_paths, train_labels, class_names = manifest_listing(
+            read_split_manifest(split_manifest), "train"
+        )
+    else:
+        file_paths, labels, class_names = list_image_files(dataset_dir)
+        train_paths, train_labels = split_file_listing(file_paths, labels, 0.2, seed, "training")
+
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(train_paths), size=min(num_samples, len(train_paths)), replace=False)
+    return [train_paths[i] for i in idx], np.asarray(train_labels)[idx], class_names
+
+
+def accuracy(head, x, y):
+    if len(y) == 0:
+        return None
+    probs = head(x, training=False).numpy()
+    return float(np.mean(np.argmax(probs, axis=1) == y))
+
+# ---------------- JOB ---------------- #
+
+def run(args):
+    start = time.perf_counter()
+
+    with open(CLASS_NAMES_PATH) as f:
+        class_names = json.load(f)
+    class_index = {name: i for i, name in enumerate(class_names)}
+
+    store = FeedbackStore(args.feedback_dir)
+    corrections = [r for r in store.corrections() if r["corrected_class"] in class_index]
+    print(f"📝 {len(corrections)} usable corrections in {args.feedback_dir}")
+
+    if len(corrections) < args.min_corrections:
+        print(f"⏸️ Need at least {args.min_corrections} corrections, nothing to do")
+        return None
+
+    model = tf.keras.models.load_model(args.model)
+    feature_model = build_feature_extractor(model.layers[0])
+
+    # Corrections
+    x_corr = embed_files(feature_model, [store.image_file(r) for r in corrections])
+    y_corr = np.array([class_index[r["corrected_class"]] for r in corrections])
+
+    # Replay sample from the original training data
+    replay_paths, y_replay, dataset_classes = replay_sample(
+        args.dataset_dir,
+        min(MAX_REPLAY, REPLAY_RATIO * len(corrections)),
+        split_manifest=args.split_manifest
+    )
+    if dataset_classes != class_names:
+        raise ValueError("Dataset folders do not match class_names.json")
+    x_replay = embed_files(feature_model, replay_paths)
+
+    n_eval = int(REPLAY_EVAL_FRACTION * len(y_replay))
+    x_replay_eval, y_replay_eval = x_replay[:n_eval], y_replay[:n_eval]
+    x_replay_train, y_replay_train = x_replay[n_eval:], y_replay[n_eval:]
+
+    head = extract_head(model)
+    before = {
+        "corrections": accuracy(head, x_corr, y_corr),
+        "replay_eval": accuracy(head, x_replay_eval, y_replay_eval),
+    }
+
+    x_train = np.concatenate([x_corr, x_replay_train])
+    y_train = np.concatenate([y_corr, y_replay_train])
+    weights = np.concatenate([
+        np.full(len(y_corr), CORRECTION_WEIGHT, np.float32),
+        np.ones(len(y_replay_train), np.float32),
+    ])
+
+    print(f"\n🚀 Fine-tuning head on {len(y_corr)} corrections + {len(y_replay_train)} replay images...\n")
+    head.compile(
+        optimizer=tf.keras.optimizers.Adam(args.learning_rate),
+        loss=tf.keras.losses.SparseCategoricalCrossentropy(),
+        metrics=["accuracy"]
+    )
+    head.fit(
+        x_train,
+        y_train,
+        sample_weight=weights,
+        batch_size=BATCH_SIZE,
+        epochs=args.epochs,
+        shuffle=True,
+        verbose=2
+    )
+
+    after = {
+        "corrections": accuracy(head, x_corr, y_corr),
+        "replay_eval": accuracy(head, x_replay_eval, y_replay_eval),
+    }
+
+    drop = (before["replay_eval"] or 0) - (after["replay_eval"] or 0)
+    accepted = drop <= MAX_REPLAY_ACC_DROP
+
+    report = {
+        "corrections": len(y_corr),
+        "replay_train": len(y_replay_train),
+        "replay_eval": len(y_replay_eval),
+        "before": before,
+        "after": after,
+        "replay_accuracy_drop": drop,
+        "accepted": accepted,
+        "seconds": time.perf_counter() - start,
+    }
+
+    print(f"\n📊 Corrections acc: {before['corrections']} → {after['corrections']}")
+    print(f"📊 Replay acc:      {before['replay_eval']} → {after['replay_eval']}")
+
+    if accepted:
+        transfer_head_weights(head, model)
+        model.save(args.output)
+        report["output"] = args.output
+        print(f"\n✅ Updated model saved to {args.output}")
+    else:
+        print(f"\n❌ Replay accuracy dropped by {drop:.3f} (> {MAX_REPLAY_ACC_DROP}), model not saved")
+
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Fine-tune the classifier head on user corrections plus replayed training data."
+    )
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--feedback-dir", default=FEEDBACK_DIR)
+    parser.add_argument("--split-manifest", default=SPLIT_MANIFEST)
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--min-corrections", type=int, default=MIN_CORRECTIONS)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -0,0 +1,101 @@
+import tensorflow as tf
+from tensorflow.keras import layers, models
+
+IMAGE_SIZE = (224, 224)
+EMBEDDING_DIM = 1280  # MobileNetV2 pooled feature size
+
+DENSE_UNITS = 256
+DROPOUT = 0.4
+
+# ---------------- ARCHITECTURE ---------------- #
+
+def build_backbone(image_size=IMAGE_SIZE, weights="imagenet"):
+    return tf.keras.applications.MobileNetV2(
+        input_shape=(*image_size, 3),
+        include_top=False,
+        weights=weights
+    )
+
+
+def head_layers(num_classes, dense_units=DENSE_UNITS, dropout=DROPOUT):
+    return [
+        layers.BatchNormalization(),
+        layers.Dense(dense_units, activation="relu"),
+        layers.Dropout(dropout),
+        # Kept in float32 under mixed precision so probabilities (and
+        # accuracy) match a plain float32 model
+        layers.Dense(num_classes, activation="softmax", dtype="float32")
+    ]
+
+
+def build_model(
+    num_classes,
+    image_size=IMAGE_SIZE,
+    weights="imagenet",
+    dense_units=DENSE_UNITS,
+    dropout=DROPOUT
+):
+    base_model = build_backbone(image_size, weights)
+    base_model.trainable = False
+
+    model = models.Sequential([
+        base_model,
+        layers.GlobalAveragePooling2D(),
+        *head_layers(num_classes, dense_units, dropout)
+    ])
+    return model, base_model
+
+
+def build_feature_extractor(base_model):
+    # Frozen backbone + pooling: image -> 1280-d embedding
+    return models.Sequential([base_model, layers.GlobalAveragePooling2D()])
+
+
+def build_head(num_classes, dense_units=DENSE_UNITS, dropout=DROPOUT, input_dim=EMBEDDING_DIM):
+    # Same layers as the top of build_model, trained on embeddings alone
+    return models.Sequential([
+        layers.Input((input_dim,)),
+        *head_layers(num_classes, dense_units, dropout)
+    ])
+
+
+def transfer_head_weights(head, model):
+    # model.layers = [backbone, pooling, *head layers]
+    for src, dst in zip(head.layers, model.layers[2:]):
+        dst.set_weights(src.get_weights())
+
+
+def extract_head(model):
+    # Standalone copy of a full model's head, e.g. to fine-tune it on
+    # embeddings and transfer the weights back
+    num_classes = model.layers[-1].units
+    head = build_head(
+        num_classes,
+        dense_units=model.layers[3].units,
+        dropout=model.layers[4].rate,
+        # From the BatchNorm weights: Keras 3 layers have no input_shape
+        input_dim=model.layers[2].gamma.shape[0]
+    )
+    for src, dst in zip(model.layers[2:], head.layers):
+        dst.set_weights(src.get_weights())
+    return head
+
+
+def float32_copy(model):
+    # Same model rebuilt under the float32 policy, for saving/exporting a
+    # model trained with mixed precision (layers keep the policy they were
+    # built with, so the saved file would otherwise compute in 16 bits)
+    policy = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy("float32")
+    try:
+        copy, _ = build_model(
+            model.layers[-1].units,
+            tuple(model.layers[0].input_shape[1:3]),
+            weights=None,
+            dense_units=model.layers[3].units,
+            dropout=model.layers[4].rate
+        )
+    finally:
+        tf.keras.mixed_precision.set_global_policy(policy)
+    copy.set_weights(model.get_weights())
+    return copy
@@ -1,15 +1,26 @@
+import sys
+import json
 import matplotlib.pyplot as plt
-import pickle
+
+HISTORY_PATH = "models/history.json"  # written by train.py
+
+
+def _series(history, key):
+    # A Keras History object or a list of per-epoch logs from history.json
+    if hasattr(history, "history"):
+        return list(history.history.get(key, []))
+    return [epoch[key] for epoch in history if key in epoch]
+
 
 def plot(history, history_fine):
-    acc = history.history['accuracy'] + history_fine.history['accuracy']
-    val_acc = history.history['val_accuracy'] + history_fine.history['val_accuracy']
+    acc = _series(history, 'accuracy') + _series(history_fine, 'accuracy')
+    val_acc = _series(history, 'val_accuracy') + _series(history_fine, 'val_accuracy')
 
-    loss = history.history['loss'] + history_fine.history['loss']
-    val_loss = history.history['val_loss'] + history_fine.history['val_loss']
+    loss = _series(history, 'loss') + _series(history_fine, 'loss')
+    val_loss = _series(history, 'val_loss') + _series(history_fine, 'val_loss')
 
     epochs = range(len(acc))
-    split_epoch = len(history.history['accuracy'])
+    split_epoch = len(_series(history, 'accuracy'))
 
     plt.figure(figsize=(12, 5))
 
@@ -27,4 +38,14 @@ def plot(history, history_fine):
     plt.legend()
     plt.title("Loss")
 
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+
+def plot_file(path=HISTORY_PATH):
+    with open(path) as f:
+        history = json.load(f)
+    plot(history.get("head", []), history.get("fine_tune", []))
+
+
+if __name__ == "__main__":
+    plot_file(sys.argv[1] if len(sys.argv) > 1 else HISTORY_PATH)
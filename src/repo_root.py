@@ -0,0 +1,8 @@
+import os
+import sys
+
+# `python src/<script>.py` only puts src/ on sys.path; scripts import
+# this module first so the shared utils package at the repo root resolves
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -0,0 +1,190 @@
+import os
+import json
+import hashlib
+import argparse
+from data_loader import list_image_files, SPLIT_MANIFEST_PATH
+
+DATASET_DIR = "dataset"
+DATASET_MANIFEST_PATH = "dataset_manifest.json"  # written by data_sort.py
+
+VAL_FRACTION = 0.15
+TEST_FRACTION = 0.10
+SALT = "ecovision-split-v1"
+
+# ---------------- ASSIGNMENT ---------------- #
+
+def group_keys(records):
+    # data_sort.py renumbers groups on every run, so a group is keyed by
+    # its smallest member hash instead of its id
+    keys = {}
+    for record in records.values():
+        if "near_dup_group" in record:
+            gid = record["near_dup_group"]
+            keys[gid] = min(keys.get(gid, record["sha256"]), record["sha256"])
+    return keys
+
+
+def split_key(rel_path, record, groups):
+    # Near-duplicate groups and identical files share a key, so they can
+    # never straddle train/val/test. Otherwise the content hash (stable
+    # across renames) or, without a data_sort manifest, the path. Keys
+    # only place files that no earlier manifest assigned (see
+    # build_split_manifest).
+    if record is not None:
+        if "near_dup_group" in record:
+            return f"sha256:{groups[record['near_dup_group']]}"
+        if "sha256" in record:
+            return f"sha256:{record['sha256']}"
+    return f"path:{rel_path}"
+
+
+def assign_split(key, val_fraction=VAL_FRACTION, test_fraction=TEST_FRACTION, salt=SALT):
+    # Depends only on the key; used for files no earlier manifest placed
+    digest = hashlib.sha256(f"{salt}|{key}".encode()).digest()
+    u = int.from_bytes(digest[:8], "big") / 2 ** 64
+    if u < test_fraction:
+        return "test"
+    if u < test_fraction + val_fraction:
+        return "val"
+    return "train"
+
+
+def previous_splits(previous, salt):
+    # {path: split} and {sha256: split} from an earlier manifest with the
+    # same salt; a new salt is a deliberate reshuffle
+    if previous is None or previous.get("salt") != salt:
+        return {}, {}
+    by_path, by_hash = {}, {}
+    for entry in previous["files"]:
+        by_path[entry["path"]] = entry["split"]
+        if "sha256" in entry:
+            by_hash[entry["sha256"]] = entry["split"]
+    return by_path, by_hash
+
+
+def inherited_split(splits):
+    # Most common earlier split among a group's members, ties broken in
+    # train/val/test order, or None if none was assigned before
+    splits = [s for s in splits if s is not None]
+    if not splits:
+        return None
+    return max(("train", "val", "test"), key=splits.count)
+
+
+def build_split_manifest(
+    dataset_dir=DATASET_DIR,
+    dataset_manifest=DATASET_MANIFEST_PATH,
+    val_fraction=VAL_FRACTION,
+    test_fraction=TEST_FRACTION,
+    salt=SALT,
+    previous=None
+):
+    """
+    Files already placed by `previous` (the last manifest) keep their
+    split, matched by path or content hash, and a near-duplicate group
+    takes the split of its already-assigned members. Only files and
+    groups seen for the first time are placed by hashing their key, so a
+    data drop never moves a training image into val/test.
+    """
+    records = {}
+    if dataset_manifest and os.path.exists(dataset_manifest):
+        with open(dataset_manifest) as f:
+            records = json.load(f).get("files", {})
+
+    groups = group_keys(records)
+    file_paths, labels, class_names = list_image_files(dataset_dir)
+
+    by_path, by_hash = previous_splits(previous, salt)
+
+    files = []
+    skipped = 0
+    for path, label in zip(file_paths, labels):
+        rel = os.path.relpath(path, dataset_dir)
+        record = records.get(rel)
+        if record is not None and record.get("status") != "ok":
+            # data_sort.py found it corrupt
+            skipped += 1
+            continue
+        entry = {"path": rel, "label": label, "key": split_key(rel, record, groups)}
+        if record is not None and "sha256" in record:
+            entry["sha256"] = record["sha256"]
+        files.append(entry)
+
+    def earlier(entry):
+        return by_path.get(entry["path"], by_hash.get(entry.get("sha256")))
+
+    # Members of one group (or copies of one file) share a key, and so
+    # one split: inherited if any member had one, else hashed
+    members = {}
+    for entry in files:
+        members.setdefault(entry["key"], []).append(entry)
+
+    kept = 0
+    for key, group in members.items():
+        split = inherited_split([earlier(entry) for entry in group])
+        if split is None:
+            split = assign_split(key, val_fraction, test_fraction, salt)
+        for entry in group:
+            entry["split"] = split
+            kept += earlier(entry) == split
+
+    counts = {}
+    for entry in files:
+        per_split = counts.setdefault(entry["split"], [0] * len(class_names))
+        per_split[entry["label"]] += 1
+
+    return {
+        "dataset_dir": dataset_dir,
+        "class_names": class_names,
+        "fractions": {"val": val_fraction, "test": test_fraction},
+        "salt": salt,
+        "counts": {
+            split: dict(zip(class_names, per_class))
+            for split, per_class in sorted(counts.items())
+        },
+        "skipped_corrupt": skipped,
+        "kept_from_previous": kept,
+        "files": files,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write a stable, leak-free train/val/test split manifest.")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--dataset-manifest", default=DATASET_MANIFEST_PATH)
+    parser.add_argument("--output", default=SPLIT_MANIFEST_PATH)
+    parser.add_argument("--val-fraction", type=float, default=VAL_FRACTION)
+    parser.add_argument("--test-fraction", type=float, default=TEST_FRACTION)
+    parser.add_argument("--salt", default=SALT)
+    parser.add_argument("--fresh", action="store_true", help="Ignore the existing manifest and re-hash every file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    previous = None
+    if not args.fresh and os.path.exists(args.output):
+        with open(args.output) as f:
+            previous = json.load(f)
+
+    manifest = build_split_manifest(
+        args.dataset_dir,
+        args.dataset_manifest,
+        args.val_fraction,
+        args.test_fraction,
+        args.salt,
+        previous=previous
+    )
+
+    tmp = args.output + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, args.output)
+
+    for split, per_class in manifest["counts"].items():
+        print(f"📂 {split:<5} {sum(per_class.values()):>7} images")
+    if previous is not None:
+        print(f"📌 {manifest['kept_from_previous']} files kept their earlier split")
+    if manifest["skipped_corrupt"]:
+        print(f"⚠️ Skipped {manifest['skipped_corrupt']} corrupt files")
+    print(f"✅ Split manifest saved to {args.output}")
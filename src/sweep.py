@@ -0,0 +1,365 @@
+import os
+import json
+import time
+import glob
+import hashlib
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+DATASET_DIR = "dataset"
+SWEEP_DIR = "sweeps"
+EMBEDDINGS_PATH = "models/embeddings.npz"
+
+IMAGE_SIZE = (224, 224)
+BATCH_SIZE = 32
+SEED = 42
+
+TRIALS = 50
+HEAD_EPOCHS = 15
+FINE_TUNE_EPOCHS = 3      # 0 = head-only trials on embeddings
+EMBEDDING_VARIANTS = 2
+DATASET_CACHE_DIR = "dataset_cache"  # decoded once, memmapped by every worker
+SPLIT_MANIFEST = None
+
+THREADS_PER_TRIAL = 2
+
+# Median pruning: after WARMUP_STEPS epochs, stop a trial whose
+# val_accuracy is below the median of the other trials at that epoch
+WARMUP_STEPS = 3
+MIN_TRIALS_TO_PRUNE = 4
+
+SEARCH_SPACE = {
+    "dense_units": [128, 256, 512],
+    "dropout": [0.2, 0.3, 0.4, 0.5],
+    "head_lr": [3e-4, 1e-4, 3e-5],
+    "fine_tune_lr": [3e-5, 1e-5, 3e-6],
+    "unfreeze_at": [60, 80, 100, 120, 140],
+}
+
+# The constants src/train.py currently uses
+BASELINE = {
+    "dense_units": 256,
+    "dropout": 0.4,
+    "head_lr": 1e-4,
+    "fine_tune_lr": 1e-5,
+    "unfreeze_at": 100,
+}
+
+# ---------------- CONFIGS ---------------- #
+
+def trial_id(config):
+    # Stable across runs, so a restarted sweep skips finished trials
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def sample_configs(n, space=SEARCH_SPACE, seed=SEED):
+    # Unique draws from the grid, baseline first
+    keys = sorted(space)
+    grid = list(itertools.product(*(space[k] for k in keys)))
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(grid), size=min(n, len(grid)), replace=False)
+
+    configs = [BASELINE]
+    for i in picks:
+        config = dict(zip(keys, grid[i]))
+        if config != BASELINE and len(configs) < n:
+            configs.append(config)
+    return configs
+
+# ---------------- TRIAL PROGRESS ---------------- #
+
+def read_trial(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_trial(path, record):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(record, f, indent=1)
+    os.replace(tmp, path)
+
+
+def median_at_step(trials_dir, step, exclude):
+    # Other trials' val_accuracy at the same epoch, finished or running
+    values = []
+    for path in glob.glob(os.path.join(trials_dir, "*.json")):
+        record = read_trial(path)
+        if record and record["id"] != exclude and len(record["val_accuracy"]) > step:
+            values.append(record["val_accuracy"][step])
+    return values
+
+# ---------------- WORKER ---------------- #
+
+_store = None
+
+STORE_ARRAYS = ("x_train", "y_train", "x_val", "y_val")
+
+
+def _init_worker(arrays_dir, intra_op_threads, inter_op_threads):
+    # Runs in a fresh (spawned) process before any TensorFlow op
+    global _store
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+    # Memory-mapped read-only: every worker shares the same page-cache
+    # pages instead of holding its own copy of the embeddings
+    _store = {
+        key: np.load(os.path.join(arrays_dir, f"{key}.npy"), mmap_mode="r")
+        for key in STORE_ARRAYS
+    }
+
+
+def _make_reporter(path, record, trials_dir, warmup_steps, min_trials):
+    import tensorflow as tf
+
+    class TrialReporter(tf.keras.callbacks.Callback):
+        """Logs val_accuracy per epoch and stops below-median trials."""
+
+        def on_epoch_end(self, epoch, logs=None):
+            value = float((logs or {}).get("val_accuracy", 0.0))
+            record["val_accuracy"].append(value)
+            step = len(record["val_accuracy"]) - 1
+            write_trial(path, record)
+
+            if step < warmup_steps:
+                return
+            others = median_at_step(trials_dir, step, record["id"])
+            if len(others) >= min_trials and value < float(np.median(others)):
+                record["status"] = "pruned"
+                record["pruned_at"] = step
+                self.model.stop_training = True
+
+    return TrialReporter()
+
+
+def run_trial(config, settings):
+    import tensorflow as tf
+    from data_loader import get_datasets
+    from model_builder import build_model, build_head, transfer_head_weights
+    from embeddings import train_head
+
+    start = time.perf_counter()
+    tf.keras.utils.set_random_seed(settings["seed"])
+
+    trials_dir = settings["trials_dir"]
+    path = os.path.join(trials_dir, f"{config['id']}.json")
+    record = {
+        "id": config["id"],
+        "config": config["params"],
+        "status": "running",
+        "val_accuracy": [],
+    }
+    write_trial(path, record)
+    reporter = _make_reporter(
+        path, record, trials_dir, settings["warmup_steps"], settings["min_trials"]
+    )
+    params = config["params"]
+
+    head = build_head(settings["num_classes"], params["dense_units"], params["dropout"])
+    train_head(
+        head,
+        _store,
+        settings["head_epochs"],
+        class_weight=settings["class_weights"],
+        batch_size=settings["batch_size"],
+        learning_rate=params["head_lr"],
+        callbacks=[reporter]
+    )
+
+    if record["status"] != "pruned" and settings["fine_tune_epochs"]:
+        model, base_model = build_model(
+            settings["num_classes"],
+            settings["image_size"],
+            dense_units=params["dense_units"],
+            dropout=params["dropout"]
+        )
+        transfer_head_weights(head, model)
+
+        base_model.trainable = True
+        for layer in base_model.layers[:params["unfreeze_at"]]:
+            layer.trainable = False
+
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(params["fine_tune_lr"]),
+            loss=tf.keras.losses.SparseCategoricalCrossentropy(),
+            metrics=["accuracy"]
+        )
+        train_ds, val_ds, _ = get_datasets(
+            settings["dataset_dir"],
+            batch_size=settings["batch_size"],
+            seed=settings["seed"],
+            image_size=settings["image_size"],
+            cache_dir=settings["cache_dir"],
+            split_manifest=settings["split_manifest"],
+            augment=True,
+            shuffle_buffer=0
+        )
+        model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=settings["fine_tune_epochs"],
+            class_weight=settings["class_weights"],
+            callbacks=[reporter],
+            verbose=0
+        )
+
+    if record["status"] != "pruned":
+        record["status"] = "complete"
+    record["best_val_accuracy"] = max(record["val_accuracy"], default=0.0)
+    record["epochs"] = len(record["val_accuracy"])
+    record["seconds"] = time.perf_counter() - start
+    write_trial(path, record)
+    return record
+
+# ---------------- LEADERBOARD ---------------- #
+
+def leaderboard(trials_dir):
+    records = [r for r in map(read_trial, glob.glob(os.path.join(trials_dir, "*.json"))) if r]
+    # Completed trials first; pruned ones only saw part of the schedule
+    rank = {"complete": 0, "pruned": 1}
+    return sorted(
+        records,
+        key=lambda r: (rank.get(r["status"], 2), -r.get("best_val_accuracy", 0.0))
+    )
+
+
+def print_leaderboard(board, top=10):
+    print(f"\n🏆 {'id':<10} {'status':<9} {'val_acc':>8} {'epochs':>6} {'min':>6}  config")
+    for r in board[:top]:
+        print(
+            f"   {r['id']:<10} {r['status']:<9} {r.get('best_val_accuracy', 0.0):>8.4f} "
+            f"{len(r['val_accuracy']):>6} {r.get('seconds', 0.0) / 60:>6.1f}  {r['config']}"
+        )
+
+# ---------------- MAIN ---------------- #
+
+def write_store_arrays(store, arrays_dir):
+    # .npz members cannot be memory-mapped, so workers read plain .npy files
+    os.makedirs(arrays_dir, exist_ok=True)
+    for key in STORE_ARRAYS:
+        path = os.path.join(arrays_dir, f"{key}.npy")
+        tmp = path + ".tmp.npy"
+        np.save(tmp, np.ascontiguousarray(store[key]))
+        os.replace(tmp, path)
+
+
+def prepare(args, arrays_dir):
+    # One embedding store (and memmap image cache) for all trials
+    from data_loader import get_datasets, compute_class_stats
+    from model_builder import build_backbone, build_feature_extractor
+    from embeddings import ensure_embedding_store
+
+    class_stats = compute_class_stats(
+        args.dataset_dir, seed=SEED, split_manifest=args.split_manifest
+    )
+    store = ensure_embedding_store(
+        build_feature_extractor(build_backbone(IMAGE_SIZE)),
+        args.dataset_dir,
+        IMAGE_SIZE,
+        batch_size=BATCH_SIZE,
+        seed=SEED,
+        variants=EMBEDDING_VARIANTS,
+        cache_dir=args.cache_dir,
+        split_manifest=args.split_manifest,
+        path=args.embeddings
+    )
+    write_store_arrays(store, arrays_dir)
+    del store
+    if args.fine_tune_epochs and args.cache_dir:
+        # Builds the memmap cache now rather than racing in every worker
+        get_datasets(args.dataset_dir, seed=SEED, cache_dir=args.cache_dir, split_manifest=args.split_manifest)
+    return class_stats
+
+
+def run(args):
+    sweep_dir = os.path.join(SWEEP_DIR, args.name)
+    trials_dir = os.path.join(sweep_dir, "trials")
+    os.makedirs(trials_dir, exist_ok=True)
+
+    arrays_dir = os.path.join(sweep_dir, "embeddings")
+    class_stats = prepare(args, arrays_dir)
+    settings = {
+        "trials_dir": trials_dir,
+        "num_classes": len(class_stats["class_names"]),
+        "class_weights": class_stats["class_weights"],
+        "dataset_dir": args.dataset_dir,
+        "image_size": IMAGE_SIZE,
+        "batch_size": BATCH_SIZE,
+        "seed": SEED,
+        "cache_dir": args.cache_dir,
+        "split_manifest": args.split_manifest,
+        "head_epochs": args.head_epochs,
+        "fine_tune_epochs": args.fine_tune_epochs,
+        "warmup_steps": args.warmup_steps,
+        "min_trials": args.min_trials,
+    }
+
+    pending = []
+    for params in sample_configs(args.trials, seed=args.seed):
+        tid = trial_id(params)
+        done = read_trial(os.path.join(trials_dir, f"{tid}.json"))
+        if done and done["status"] in ("complete", "pruned"):
+            continue
+        pending.append({"id": tid, "params": params})
+
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads)
+    print(f"\n🧪 {len(pending)} trials to run on {workers} workers × {args.threads} threads")
+
+    # spawn: TensorFlow is already loaded here and is not fork-safe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(arrays_dir, args.threads, 1)
+    ) as pool:
+        futures = {pool.submit(run_trial, config, settings): config for config in pending}
+        for n, future in enumerate(as_completed(futures), 1):
+            config = futures[future]
+            try:
+                record = future.result()
+            except Exception as exc:
+                record = {"id": config["id"], "config": config["params"], "status": "failed",
+                          "error": f"{type(exc).__name__}: {exc}", "val_accuracy": []}
+                write_trial(os.path.join(trials_dir, f"{config['id']}.json"), record)
+            print(
+                f"   [{n}/{len(pending)}] {record['id']} {record['status']:<8} "
+                f"best val_acc {record.get('best_val_accuracy', 0.0):.4f}"
+            )
+
+    board = leaderboard(trials_dir)
+    with open(os.path.join(sweep_dir, "leaderboard.json"), "w") as f:
+        json.dump(board, f, indent=2)
+
+    print_leaderboard(board)
+    print(f"\n✅ Leaderboard saved to {os.path.join(sweep_dir, 'leaderboard.json')}")
+    return board
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parallel hyperparameter sweep over the training pipeline.")
+    parser.add_argument("--name", default="default", help=f"Sweep folder under {SWEEP_DIR}/")
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--seed", type=int, default=SEED, help="Config sampling seed")
+    parser.add_argument("--workers", type=int, help="Default: CPU cores // --threads")
+    parser.add_argument("--threads", type=int, default=THREADS_PER_TRIAL, help="Intra-op threads per trial")
+    parser.add_argument("--head-epochs", type=int, default=HEAD_EPOCHS)
+    parser.add_argument("--fine-tune-epochs", type=int, default=FINE_TUNE_EPOCHS)
+    parser.add_argument("--warmup-steps", type=int, default=WARMUP_STEPS)
+    parser.add_argument("--min-trials", type=int, default=MIN_TRIALS_TO_PRUNE)
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--cache-dir", default=DATASET_CACHE_DIR)
+    parser.add_argument("--split-manifest", default=SPLIT_MANIFEST)
+    parser.add_argument("--embeddings", default=EMBEDDINGS_PATH)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -1,41 +1,105 @@
-import tensorflow as tf
-import numpy as np
+import os
 import json
-from tensorflow.keras import layers, models
-from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
-from sklearn.utils.class_weight import compute_class_weight
+import shutil
+import tensorflow as tf
+import repo_root  # noqa: F401  (makes the shared utils package importable)
+from data_loader import get_datasets, compute_class_stats, save_class_stats
+from model_builder import (
+    build_model,
+    build_feature_extractor,
+    build_head,
+    transfer_head_weights,
+    float32_copy
+)
+from embeddings import ensure_embedding_store, train_head
+from training_utils import (
+    apply_precision_policy,
+    ThroughputLogger,
+    BestModelCheckpoint,
+    phase_callbacks,
+    load_history,
+    best_from_history
+)
 
 DATASET_DIR = "dataset"
 MODEL_PATH = "models/waste_classifier.h5"
 CLASS_NAMES_PATH = "class_names.json"
+CLASS_STATS_PATH = "class_stats.json"
 
 IMAGE_SIZE = (224, 224)
 BATCH_SIZE = 32
 EPOCHS = 20
 FINE_TUNE_EPOCHS = 15
 SEED = 42
+EXPORT_TFLITE = True
+REGISTER_MODEL = True  # publish to models/registry (utils/model_registry.py)
+
+# Hyperparameters (src/sweep.py searches over these)
+DENSE_UNITS = 256
+DROPOUT = 0.4
+HEAD_LR = 1e-4
+FINE_TUNE_LR = 1e-5
+UNFREEZE_AT = 100  # backbone layers below this index stay frozen
+
+# Checkpointing: each phase backs up weights + optimizer state every
+# epoch and an interrupted run picks up where it stopped
+CHECKPOINT_DIR = "models/checkpoints"
+HISTORY_PATH = "models/history.json"
+BEST_MODEL_PATH = "models/waste_classifier_best.h5"
+RESUME = True  # False discards checkpoints and history and starts over
+
+# Set a patience to None to disable the callback
+EARLY_STOPPING_PATIENCE = 5   # epochs without val_accuracy gain
+REDUCE_LR_PATIENCE = 2        # epochs without val_loss gain
+REDUCE_LR_FACTOR = 0.2
+MIN_LR = 1e-7
+
+# Set to a folder (e.g. "dataset_cache") to decode/resize every image once
+# into a memory-mapped array instead of re-decoding JPEGs each epoch. Same
+# resize as the uncached path; pixels are only rounded to uint8
+DATASET_CACHE_DIR = None
+
+# Set to a split manifest (python src/split_manifest.py) for a stable
+# train/val/test split instead of the seeded 80/20 validation_split
+SPLIT_MANIFEST = None
+
+# Input pipeline tuning (see data_loader.get_datasets)
+DATASET_TF_CACHE = False  # True = in-memory tf.data cache, or a filename
+DETERMINISTIC = True
+NUM_PARALLEL_CALLS = tf.data.AUTOTUNE
+PREFETCH = tf.data.AUTOTUNE
+
+# Train the head on precomputed frozen-backbone embeddings instead of
+# running MobileNetV2 over every image for each of the EPOCHS
+HEAD_FROM_EMBEDDINGS = False
+EMBEDDING_VARIANTS = 2  # extra augmented passes over the training set
+EMBEDDINGS_PATH = "models/embeddings.npz"
+
+# Compute settings for both model.fit phases
+JIT_COMPILE = False          # XLA-compile the train step
+MIXED_PRECISION = None       # None, "auto", "mixed_bfloat16" or "mixed_float16"
+STEPS_PER_EXECUTION = 1      # train steps per tf.function call
 
 # ---------------- LOAD DATA ---------------- #
 
-train_ds = tf.keras.utils.image_dataset_from_directory(
+train_ds, val_ds, class_names = get_datasets(
     DATASET_DIR,
-    image_size=IMAGE_SIZE,
     batch_size=BATCH_SIZE,
-    validation_split=0.2,
-    subset="training",
-    seed=SEED
-)
-
-val_ds = tf.keras.utils.image_dataset_from_directory(
-    DATASET_DIR,
+    val_split=0.2,
+    seed=SEED,
     image_size=IMAGE_SIZE,
-    batch_size=BATCH_SIZE,
-    validation_split=0.2,
-    subset="validation",
-    seed=SEED
+    cache_dir=DATASET_CACHE_DIR,
+    split_manifest=SPLIT_MANIFEST,
+    cache=DATASET_TF_CACHE,
+    augment=True,
+    deterministic=DETERMINISTIC,
+    # Files are reshuffled every epoch upstream; only a cached dataset
+    # needs its batch order reshuffled
+    shuffle_buffer=64 if DATASET_TF_CACHE else 0,
+    num_parallel_calls=NUM_PARALLEL_CALLS,
+    prefetch=PREFETCH
 )
 
-class_names = train_ds.class_names
 num_classes = len(class_names)
 
 print(f"📦 Classes ({num_classes}): {class_names}")
@@ -44,86 +108,125 @@ print(f"📦 Classes ({num_classes}): {class_names}")
 with open(CLASS_NAMES_PATH, "w") as f:
     json.dump(class_names, f)
 
-data_augmentation = tf.keras.Sequential([
-    layers.RandomFlip("horizontal"),
-    layers.RandomRotation(0.1),
-    layers.RandomZoom(0.1),
-    layers.RandomContrast(0.1),
-])
-
-# ---------------- PREPROCESS ---------------- #
-
-train_ds = train_ds.map(
-    lambda x, y: (preprocess_input(data_augmentation(x)), y),
-    num_parallel_calls=tf.data.AUTOTUNE
-)
-
-val_ds = val_ds.map(
-    lambda x, y: (preprocess_input(x), y),
-    num_parallel_calls=tf.data.AUTOTUNE
-)
-
-train_ds = train_ds.prefetch(tf.data.AUTOTUNE)
-val_ds = val_ds.prefetch(tf.data.AUTOTUNE)
-
 # ---------------- CLASS WEIGHTS ---------------- #
 
-raw_train_ds = tf.keras.utils.image_dataset_from_directory(
-    DATASET_DIR,
-    image_size=IMAGE_SIZE,
-    batch_size=BATCH_SIZE,
-    validation_split=0.2,
-    subset="training",
-    seed=SEED
-)
-
-y_train = np.concatenate([y.numpy() for _, y in train_ds])
-
-
-class_weights = compute_class_weight(
-    class_weight="balanced",
-    classes=np.unique(y_train),
-    y=y_train
+# Computed from the file listing, no decode pass over train_ds
+class_stats = compute_class_stats(
+    DATASET_DIR, val_split=0.2, seed=SEED, split_manifest=SPLIT_MANIFEST
 )
+save_class_stats(class_stats, CLASS_STATS_PATH)
 
-class_weights = dict(enumerate(class_weights))
+class_weights = class_stats["class_weights"]
 print("⚖️ Class Weights:", class_weights)
 
 # ---------------- MODEL ---------------- #
 
-base_model = tf.keras.applications.MobileNetV2(
-    input_shape=(*IMAGE_SIZE, 3),
-    include_top=False,
-    weights="imagenet"
+# Must be set before any layer is built
+precision = apply_precision_policy(MIXED_PRECISION)
+print(f"🧮 Precision: {precision} | XLA: {JIT_COMPILE} | steps/execution: {STEPS_PER_EXECUTION}")
+
+
+def saved_model():
+    # Everything written to disk (checkpoints, exports, registry) is float32
+    return model if precision == "float32" else float32_copy(model)
+
+compile_kwargs = {
+    "jit_compile": JIT_COMPILE,
+    "steps_per_execution": STEPS_PER_EXECUTION,
+}
+throughput = ThroughputLogger(BATCH_SIZE)
+
+# ---------------- CHECKPOINTS ---------------- #
+
+resuming = RESUME and os.path.isdir(CHECKPOINT_DIR)
+if not resuming:
+    shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+    if os.path.exists(HISTORY_PATH):
+        os.remove(HISTORY_PATH)
+os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+
+HEAD_DONE_PATH = os.path.join(CHECKPOINT_DIR, "head_complete.weights.h5")
+history = load_history(HISTORY_PATH)
+if resuming:
+    print(f"♻️ Resuming from {CHECKPOINT_DIR} ({len(history.get('head', []))} head / "
+          f"{len(history.get('fine_tune', []))} fine-tune epochs logged)")
+
+callback_kwargs = {
+    "checkpoint_dir": CHECKPOINT_DIR,
+    "history_path": HISTORY_PATH,
+    "early_stopping_patience": EARLY_STOPPING_PATIENCE,
+    "reduce_lr_patience": REDUCE_LR_PATIENCE,
+    "reduce_lr_factor": REDUCE_LR_FACTOR,
+    "min_lr": MIN_LR,
+}
+best_checkpoint = BestModelCheckpoint(
+    lambda: saved_model().save(BEST_MODEL_PATH),
+    best=best_from_history(history)
 )
 
-base_model.trainable = False
-
-model = models.Sequential([
-    base_model,
-    layers.GlobalAveragePooling2D(),
-    layers.BatchNormalization(),
-    layers.Dense(256, activation="relu"),
-    layers.Dropout(0.4),
-    layers.Dense(num_classes, activation="softmax")
-])
+model, base_model = build_model(num_classes, IMAGE_SIZE, dense_units=DENSE_UNITS, dropout=DROPOUT)
 
 model.compile(
-    optimizer=tf.keras.optimizers.Adam(1e-4),
+    optimizer=tf.keras.optimizers.Adam(HEAD_LR),
     loss=tf.keras.losses.SparseCategoricalCrossentropy(),
-    metrics=["accuracy"]
+    metrics=["accuracy"],
+    **compile_kwargs
 )
 
 # ---------------- TRAIN (HEAD) ---------------- #
 
-print("\n🚀 Training classifier head...\n")
-
-history = model.fit(
-    train_ds,
-    validation_data=val_ds,
-    epochs=EPOCHS,
-    class_weight=class_weights
-)
+if os.path.exists(HEAD_DONE_PATH):
+    print("\n⏭️ Classifier head already trained, loading checkpoint...\n")
+    model.load_weights(HEAD_DONE_PATH)
+elif HEAD_FROM_EMBEDDINGS:
+    print("\n🚀 Training classifier head...\n")
+
+    store = ensure_embedding_store(
+        build_feature_extractor(base_model),
+        DATASET_DIR,
+        IMAGE_SIZE,
+        batch_size=BATCH_SIZE,
+        seed=SEED,
+        variants=EMBEDDING_VARIANTS,
+        cache_dir=DATASET_CACHE_DIR,
+        split_manifest=SPLIT_MANIFEST,
+        path=EMBEDDINGS_PATH
+    )
+
+    head = build_head(num_classes, DENSE_UNITS, DROPOUT)
+
+    def save_best_head():
+        # The callback sees the standalone head; save the full model
+        transfer_head_weights(head, model)
+        saved_model().save(BEST_MODEL_PATH)
+
+    head_best = BestModelCheckpoint(save_best_head, best=best_checkpoint.best)
+    train_head(
+        head,
+        store,
+        EPOCHS,
+        class_weight=class_weights,
+        batch_size=BATCH_SIZE,
+        learning_rate=HEAD_LR,
+        callbacks=[throughput, head_best] + phase_callbacks("head", **callback_kwargs),
+        **compile_kwargs
+    )
+    best_checkpoint.best = head_best.best
+
+    # Plug the trained head back on top of the frozen backbone
+    transfer_head_weights(head, model)
+    model.save_weights(HEAD_DONE_PATH)
+else:
+    print("\n🚀 Training classifier head...\n")
+
+    model.fit(
+        train_ds,
+        validation_data=val_ds,
+        epochs=EPOCHS,
+        class_weight=class_weights,
+        callbacks=[throughput, best_checkpoint] + phase_callbacks("head", **callback_kwargs)
+    )
+    model.save_weights(HEAD_DONE_PATH)
 
 # ---------------- FINE-TUNE ---------------- #
 
@@ -132,24 +235,65 @@ print("\n🔧 Fine-tuning backbone...\n")
 base_model.trainable = True
 
 # Freeze early layers (generic features)
-for layer in base_model.layers[:100]:
+for layer in base_model.layers[:UNFREEZE_AT]:
     layer.trainable = False
 
 model.compile(
-    optimizer=tf.keras.optimizers.Adam(1e-5),
+    optimizer=tf.keras.optimizers.Adam(FINE_TUNE_LR),
     loss=tf.keras.losses.SparseCategoricalCrossentropy(),
-    metrics=["accuracy"]
+    metrics=["accuracy"],
+    **compile_kwargs
 )
 
-history_fine = model.fit(
+model.fit(
     train_ds,
     validation_data=val_ds,
     epochs=FINE_TUNE_EPOCHS,
-    class_weight=class_weights
+    class_weight=class_weights,
+    callbacks=[throughput, best_checkpoint] + phase_callbacks("fine_tune", **callback_kwargs)
 )
 
 
 # ---------------- SAVE ---------------- #
 
-model.save(MODEL_PATH)
-print(f"\n✅ Model saved to {MODEL_PATH}")
\ No newline at end of file
+final_model = saved_model()
+final_model.save(MODEL_PATH)
+print(f"\n✅ Model saved to {MODEL_PATH}")
+print(f"🏆 Best val_accuracy {best_checkpoint.best:.4f} kept at {BEST_MODEL_PATH}")
+print(f"📈 History saved to {HISTORY_PATH} (python src/plot_metrics.py)")
+
+# The run is complete; the next one starts fresh
+shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True)
+
+# ---------------- EXPORT ---------------- #
+
+tflite_report = None
+if EXPORT_TFLITE:
+    from export_tflite import export_all
+    tflite_report = export_all(
+        final_model,
+        DATASET_DIR,
+        split_manifest=SPLIT_MANIFEST,
+        cache_dir=DATASET_CACHE_DIR
+    )
+
+# ---------------- REGISTER ---------------- #
+
+if REGISTER_MODEL:
+    from export_tflite import FLOAT16_PATH, INT8_PATH
+    from utils.model_registry import publish, version_id, TFLITE_FILE, TFLITE_FP16_FILE
+
+    final_epoch = (load_history(HISTORY_PATH).get("fine_tune") or [{}])[-1]
+    entry = publish(
+        final_model,
+        class_names,
+        metrics={
+            "best_val_accuracy": best_checkpoint.best,
+            **{k: v for k, v in final_epoch.items() if k.startswith("val_")},
+            "train_counts": class_stats["train_counts"],
+            "tflite": tflite_report,
+        },
+        extra_files={TFLITE_FILE: INT8_PATH, TFLITE_FP16_FILE: FLOAT16_PATH} if EXPORT_TFLITE else None,
+        source=MODEL_PATH
+    )
+    print(f"📚 Registered {version_id(entry)} at {entry['path']}")
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import tensorflow as tf
+
+# ---------------- PRECISION ---------------- #
+
+def cpu_supports_bfloat16():
+    # AVX512-BF16 / AMX are what make bfloat16 faster than float32 on CPU
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def resolve_precision_policy(policy):
+    # None/"float32" -> plain float32; "auto" -> bfloat16 on a GPU-less
+    # box only if the CPU has native support; anything else is passed on
+    if policy in (None, "float32"):
+        return "float32"
+    if policy == "auto":
+        if tf.config.list_physical_devices("GPU"):
+            return "mixed_float16"
+        return "mixed_bfloat16" if cpu_supports_bfloat16() else "float32"
+    return policy
+
+
+def apply_precision_policy(policy):
+    policy = resolve_precision_policy(policy)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return policy
+
+# ---------------- THROUGHPUT ---------------- #
+
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    """Prints images/sec and mean step time after every training epoch."""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+        self.epochs = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        # With steps_per_execution > 1 this fires once per execution and
+        # `batch` is the index of the last step it ran
+        self._steps = batch + 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        # Includes the validation pass, which is part of the epoch cost
+        elapsed = time.perf_counter() - self._start
+        images = self._steps * self.batch_size
+        stats = {
+            "epoch": epoch + 1,
+            "seconds": elapsed,
+            "images_per_sec": images / max(elapsed, 1e-9),
+            "step_ms": 1000 * elapsed / max(self._steps, 1),
+        }
+        self.epochs.append(stats)
+        print(
+            f"⏱️ Epoch {stats['epoch']}: {stats['images_per_sec']:.1f} img/s | "
+            f"{stats['step_ms']:.1f} ms/step"
+        )
+
+# ---------------- CHECKPOINTS & HISTORY ---------------- #
+
+def load_history(path):
+    # {"head": [epoch logs...], "fine_tune": [...]}
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def best_from_history(history, monitor="val_accuracy"):
+    values = [e[monitor] for entries in history.values() for e in entries if monitor in e]
+    return max(values) if values else None
+
+
+class HistoryLogger(tf.keras.callbacks.Callback):
+    """
+    Writes every epoch's logs to a JSON file under its phase name, so a
+    resumed run continues the same curves instead of starting new ones.
+    """
+
+    def __init__(self, path, phase):
+        super().__init__()
+        self.path = path
+        self.phase = phase
+
+    def on_epoch_end(self, epoch, logs=None):
+        history = load_history(self.path)
+        # Epochs after a restored checkpoint are overwritten on resume
+        entries = history.get(self.phase, [])[:epoch]
+        entries.append({k: float(v) for k, v in (logs or {}).items()})
+        history[self.phase] = entries
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(history, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class BestModelCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Calls save_fn whenever `monitor` (higher is better) beats the best
+    value so far. Seed `best` from the persisted history so a resumed run
+    does not overwrite a better model from before the crash.
+    """
+
+    def __init__(self, save_fn, monitor="val_accuracy", best=None):
+        super().__init__()
+        self.save_fn = save_fn
+        self.monitor = monitor
+        self.best = float("-inf") if best is None else best
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = (logs or {}).get(self.monitor)
+        if value is None or value <= self.best:
+            return
+        self.best = float(value)
+        self.save_fn()
+        print(f"💾 New best {self.monitor}: {self.best:.4f}")
+
+
+def phase_callbacks(
+    phase,
+    checkpoint_dir,
+    history_path,
+    early_stopping_patience=None,
+    reduce_lr_patience=None,
+    reduce_lr_factor=0.2,
+    min_lr=1e-7
+):
+    # History is written before the backup, so a crash in between only
+    # leaves an extra epoch that the resumed run overwrites
+    callbacks = [
+        HistoryLogger(history_path, phase),
+        # Weights, optimizer state and epoch; restored by the next fit()
+        # in this directory and deleted once the phase completes
+        tf.keras.callbacks.BackupAndRestore(os.path.join(checkpoint_dir, phase)),
+    ]
+    if early_stopping_patience is not None:
+        callbacks.append(tf.keras.callbacks.EarlyStopping(
+            monitor="val_accuracy",
+            patience=early_stopping_patience,
+            restore_best_weights=True
+        ))
+    if reduce_lr_patience is not None:
+        callbacks.append(tf.keras.callbacks.ReduceLROnPlateau(
+            monitor="val_loss",
+            factor=reduce_lr_factor,
+            patience=reduce_lr_patience,
+            min_lr=min_lr
+        ))
+    return callbacks
@@ -0,0 +1,22 @@
+import os
+
+# --------------------------------------------------
+# Append-only line logs (CSV / JSONL)
+# --------------------------------------------------
+def truncate_torn_line(path, chunk_size=1 << 16):
+    # An interrupted run can leave a partial last line; appending after
+    # it would merge it with the next row, so cut back to the last newline
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
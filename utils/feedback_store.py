@@ -0,0 +1,103 @@
+import os
+import io
+import json
+import time
+import hashlib
+import threading
+
+from PIL import Image
+
+from utils.append_log import truncate_torn_line
+
+# --------------------------------------------------
+# Store layout
+# --------------------------------------------------
+#   feedback/corrections.jsonl      one JSON record per correction
+#   feedback/images/ab/abcdef....jpg original upload bytes, by sha256
+FEEDBACK_DIR = "feedback"
+
+
+class FeedbackStore:
+    """
+    Append-only log of user corrections from the prediction page. Image
+    bytes are stored once per content hash; the same (image, corrected
+    class) pair is only logged once.
+    """
+
+    def __init__(self, root=FEEDBACK_DIR):
+        self.root = root
+        self.log_path = os.path.join(root, "corrections.jsonl")
+        self.images_dir = os.path.join(root, "images")
+        self._lock = threading.Lock()
+
+        os.makedirs(self.images_dir, exist_ok=True)
+        # A crash mid-write leaves a partial last line; the next record
+        # would be appended onto it and lost
+        truncate_torn_line(self.log_path)
+        self._seen = {(r["image_sha256"], r["corrected_class"]) for r in self._read_log()}
+
+    def _read_log(self):
+        if not os.path.exists(self.log_path):
+            return []
+        records = []
+        with open(self.log_path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Torn final line after a crash
+                    continue
+        return records
+
+    def _image_path(self, digest, ext):
+        return os.path.join(self.images_dir, digest[:2], f"{digest}{ext}")
+
+    def _store_image(self, data, digest):
+        try:
+            fmt = Image.open(io.BytesIO(data)).format or "JPEG"
+        except OSError:
+            fmt = "JPEG"
+        ext = ".png" if fmt == "PNG" else ".jpg"
+        path = self._image_path(digest, ext)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return os.path.relpath(path, self.root)
+
+    def record(self, image_bytes, predicted_class, corrected_class, confidences, model_version=None):
+        digest = hashlib.sha256(image_bytes).hexdigest()
+
+        with self._lock:
+            if (digest, corrected_class) in self._seen:
+                return None
+
+            record = {
+                "timestamp": time.time(),
+                "image_sha256": digest,
+                "image_path": self._store_image(image_bytes, digest),
+                "predicted_class": predicted_class,
+                "corrected_class": corrected_class,
+                "confidences": confidences,
+                "model_version": model_version,
+            }
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._seen.add((digest, corrected_class))
+            return record
+
+    def corrections(self):
+        # Latest correction per image wins
+        latest = {}
+        for record in self._read_log():
+            latest[record["image_sha256"]] = record
+        return list(latest.values())
+
+    def image_file(self, record):
+        return os.path.join(self.root, record["image_path"])
@@ -0,0 +1,330 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# --------------------------------------------------
+# Micro-batching defaults
+# --------------------------------------------------
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10
+
+
+def top_k(probs, class_names, k=2):
+    k = min(k, len(probs))
+    # argpartition is O(n); only the k winners get sorted
+    idx = np.argpartition(probs, -k)[-k:]
+    idx = idx[np.argsort(probs[idx])[::-1]]
+    return [(class_names[i], float(probs[i])) for i in idx]
+
+
+# --------------------------------------------------
+# Inference Engine
+# --------------------------------------------------
+class InferenceEngine:
+    """
+    Groups images submitted from concurrent sessions into a single
+    forward pass. A batch is flushed once it holds `max_batch_size`
+    images or the oldest request has waited `max_wait_ms`.
+    """
+
+    def __init__(
+        self,
+        predict_fn,
+        class_names,
+        max_batch_size=MAX_BATCH_SIZE,
+        max_wait_ms=MAX_WAIT_MS
+    ):
+        self.predict_fn = predict_fn
+        self.class_names = class_names
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(
+            target=self._run,
+            name="inference-engine",
+            daemon=True
+        )
+        self._worker.start()
+
+    # ---------------- Public API ---------------- #
+
+    def submit(self, image):
+        # Accepts a preprocessed (224, 224, 3) or (1, 224, 224, 3) array
+        if self._closed:
+            raise RuntimeError("InferenceEngine is closed")
+
+        if image.ndim == 4:
+            image = image[0]
+
+        future = Future()
+        self._queue.put((image, future))
+        return future
+
+    def predict(self, image, timeout=None):
+        return self.submit(image).result(timeout=timeout)
+
+    def classify(self, image, k=2, timeout=None):
+        return top_k(self.predict(image, timeout=timeout), self.class_names, k)
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    # ---------------- Worker loop ---------------- #
+
+    def _collect_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish the current batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            # Futures cancelled while queued are dropped; the rest can no
+            # longer be cancelled once marked running
+            batch = [(image, f) for image, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            images, futures = zip(*batch)
+            try:
+                probs = np.asarray(self.predict_fn(np.stack(images)))
+                if len(probs) != len(futures):
+                    raise ValueError(
+                        f"predict_fn returned {len(probs)} rows for {len(futures)} images"
+                    )
+            except Exception as exc:
+                self._resolve(futures, exc=exc)
+                continue
+
+            self._resolve(futures, probs)
+
+    @staticmethod
+    def _resolve(futures, results=None, exc=None):
+        # Every future gets a result or the exception, and a failure here
+        # must not kill the worker thread, or every later predict() would
+        # hang
+        for i, future in enumerate(futures):
+            try:
+                if exc is not None:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(results[i])
+            except Exception:
+                continue
+
+
+# --------------------------------------------------
+# Compiled single-call predictor
+# --------------------------------------------------
+MODEL_PATH = "models/waste_classifier.h5"
+IMAGE_SIZE = (224, 224)
+LATENCY_WINDOW = 1000
+
+
+class CompiledPredictor:
+    """
+    Calls the Keras model through a traced tf.function with a fixed
+    (None, 224, 224, 3) signature, skipping the data-adapter and
+    callback setup that model.predict pays on every call.
+    """
+
+    def __init__(self, model, image_size=IMAGE_SIZE, warmup=True):
+        import tensorflow as tf
+
+        self.model = model
+        self.image_size = image_size
+        self._tf = tf
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[
+                tf.TensorSpec((None, *image_size, 3), tf.float32)
+            ]
+        )
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.last_latency_ms = None
+
+        if warmup:
+            self.warmup()
+
+    def warmup(self):
+        # Traces the graph once so the first real upload is not slow
+        self._fn(self._tf.zeros((1, *self.image_size, 3), self._tf.float32))
+
+    def __call__(self, batch):
+        if not self._tf.is_tensor(batch):
+            batch = np.asarray(batch, dtype=np.float32)
+        if len(batch.shape) == 3:
+            batch = batch[np.newaxis]
+
+        start = time.perf_counter()
+        probs = self._fn(batch).numpy()
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        self.latencies_ms.append(self.last_latency_ms)
+        return probs
+
+    def latency_summary(self):
+        return summarize_latencies(self.latencies_ms)
+
+
+def summarize_latencies(latencies_ms):
+    if not latencies_ms:
+        return {"calls": 0}
+    arr = np.asarray(latencies_ms)
+    return {
+        "calls": int(arr.size),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+    }
+
+
+# --------------------------------------------------
+# TFLite interpreter predictor
+# --------------------------------------------------
+def _tflite_interpreter_cls():
+    # Prefer the slim runtime on serving boxes; fall back to full TF
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLitePredictor:
+    """
+    Same call contract as CompiledPredictor, backed by a float16 or
+    full-integer TFLite model. Quantized inputs/outputs are converted
+    using the scale and zero point stored in the model.
+    """
+
+    def __init__(self, model_path, image_size=IMAGE_SIZE, num_threads=None, warmup=True):
+        Interpreter = _tflite_interpreter_cls()
+
+        self.model_path = model_path
+        self.image_size = image_size
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self.last_latency_ms = None
+
+        if warmup:
+            self(np.zeros((1, *image_size, 3), np.float32))
+
+    def _resize(self, batch_size):
+        if batch_size == self._batch_size:
+            return
+        self.interpreter.resize_tensor_input(
+            self._input["index"], [batch_size, *self.image_size, 3]
+        )
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def _quantize(self, batch):
+        dtype = self._input["dtype"]
+        if dtype == np.float32:
+            return batch
+        scale, zero_point = self._input["quantization"]
+        info = np.iinfo(dtype)
+        q = np.round(batch / scale + zero_point)
+        return np.clip(q, info.min, info.max).astype(dtype)
+
+    def _dequantize(self, out):
+        if self._output["dtype"] == np.float32:
+            return out
+        scale, zero_point = self._output["quantization"]
+        return (out.astype(np.float32) - zero_point) * scale
+
+    def __call__(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if batch.ndim == 3:
+            batch = batch[np.newaxis]
+
+        # The interpreter holds tensor buffers, so calls are serialized
+        with self._lock:
+            start = time.perf_counter()
+            self._resize(batch.shape[0])
+            self.interpreter.set_tensor(self._input["index"], self._quantize(batch))
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self._output["index"])
+            probs = self._dequantize(out)
+            self.last_latency_ms = (time.perf_counter() - start) * 1000
+
+        self.latencies_ms.append(self.last_latency_ms)
+        return probs
+
+    def latency_summary(self):
+        return summarize_latencies(self.latencies_ms)
+
+
+def load_predictor(model_path=MODEL_PATH, backend="keras", warmup=True, num_threads=None):
+    if backend == "tflite":
+        return TFLitePredictor(model_path, num_threads=num_threads, warmup=warmup)
+    if backend != "keras":
+        raise ValueError(f"Unknown model backend: {backend!r}")
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path)
+    return CompiledPredictor(model, warmup=warmup)
+
+
+def compare_with_predict(predictor, runs=20, batch_size=1):
+    # Times model.predict against the compiled path on the same input
+    batch = np.random.uniform(
+        -1, 1, (batch_size, *predictor.image_size, 3)
+    ).astype(np.float32)
+
+    predict_ms = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        predictor.model.predict(batch, verbose=0)
+        predict_ms.append((time.perf_counter() - start) * 1000)
+
+    compiled_ms = []
+    for _ in range(runs):
+        predictor(batch)
+        compiled_ms.append(predictor.last_latency_ms)
+
+    return {
+        "model.predict": summarize_latencies(predict_ms),
+        "compiled": summarize_latencies(compiled_ms),
+    }
@@ -0,0 +1,56 @@
+import json
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+# --------------------------------------------------
+# Client for serve.py
+# --------------------------------------------------
+TIMEOUT_S = 10
+
+
+class RemoteInferenceError(RuntimeError):
+    """The inference service could not be reached or refused the request."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class RemotePredictor:
+    """
+    Sends raw upload bytes to the HTTP inference service and returns the
+    probability vector, so UI processes never load TensorFlow.
+    """
+
+    def __init__(self, base_url, timeout=TIMEOUT_S):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, data=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            headers={"Content-Type": "application/octet-stream"} if data else {}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            # 429: queue full, 503: model still loading (see serve.py)
+            raise RemoteInferenceError(
+                f"Inference service returned HTTP {exc.code} for {path}", status=exc.code
+            ) from exc
+        except OSError as exc:
+            # URLError, timeouts and dropped connections
+            raise RemoteInferenceError(f"Inference service unreachable: {exc}") from exc
+        except ValueError as exc:
+            raise RemoteInferenceError(f"Invalid response from inference service: {exc}") from exc
+
+    def model_version(self):
+        return self._request("/readyz")["model_version"]
+
+    def predict(self, data: bytes):
+        result = self._request("/predict", data)
+        return np.asarray(result["probabilities"], dtype=np.float32)
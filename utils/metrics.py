@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+
+# --------------------------------------------------
+# Configuration
+# --------------------------------------------------
+ENABLED = os.environ.get("ECOVISION_METRICS", "0") == "1"
+PREFIX = "ecovision_"
+
+# Stage latency buckets, in seconds (Prometheus convention)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_NULL_TIMER = nullcontext()
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class Metrics:
+    """
+    Counters and latency histograms for the prediction path. When
+    disabled, every call returns immediately and `timer` hands back a
+    shared no-op context manager.
+    """
+
+    def __init__(self, enabled=ENABLED, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    # ---------------- Recording ---------------- #
+
+    def inc(self, name, labels=None, value=1):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        if not self.enabled:
+            return
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                }
+            i = bisect.bisect_left(self.buckets, seconds)
+            if i < len(self.buckets):
+                hist["buckets"][i] += 1
+            hist["count"] += 1
+            hist["sum"] += seconds
+
+    def timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, {"stage": stage})
+
+    # ---------------- Export ---------------- #
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self._counters}):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for (n, key), value in sorted(self._counters.items()):
+                    if n == name:
+                        lines.append(f"{PREFIX}{name}{_format_labels(key)} {value}")
+
+            for name in sorted({n for n, _ in self._histograms}):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for (n, key), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, hist["buckets"]):
+                        cumulative += count
+                        labels = _format_labels(key, [("le", bound)])
+                        lines.append(f"{PREFIX}{name}_bucket{labels} {cumulative}")
+                    labels = _format_labels(key, [("le", "+Inf")])
+                    lines.append(f"{PREFIX}{name}_bucket{labels} {hist['count']}")
+                    lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {hist['sum']}")
+                    lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {hist['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "counters": [
+                    {"name": n, "labels": dict(key), "value": v}
+                    for (n, key), v in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": n,
+                        "labels": dict(key),
+                        "count": h["count"],
+                        "sum": h["sum"],
+                        "buckets": dict(zip(map(str, self.buckets), h["buckets"])),
+                    }
+                    for (n, key), h in sorted(self._histograms.items())
+                ],
+            }
+
+    def dump_json(self, path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+    def start_json_dump(self, path, interval_s=30):
+        # Periodic dump for processes that cannot serve /metrics (Streamlit)
+        def loop():
+            while True:
+                time.sleep(interval_s)
+                self.dump_json(path)
+
+        thread = threading.Thread(target=loop, name="metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+
+# Process-wide registry shared by the page and the HTTP service
+REGISTRY = Metrics()
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+# --------------------------------------------------
+# Registry layout
+# --------------------------------------------------
+#   models/registry/LATEST              name of the newest version
+#   models/registry/v0003/model.keras   Keras v3 archive
+#   models/registry/v0003/*.tflite      optional exports (src/export_tflite.py)
+#   models/registry/v0003/manifest.json class names, preprocessing, metrics, hash
+#
+# A version folder is written under a temporary name and renamed into
+# place, so readers never see a half-written version.
+REGISTRY_DIR = "models/registry"
+MODEL_FILE = "model.keras"
+TFLITE_FILE = "model_int8.tflite"      # served by the "tflite" backend
+TFLITE_FP16_FILE = "model_fp16.tflite"
+LATEST_FILE = "LATEST"
+
+# Matches utils/preprocessing.py
+PREPROCESSING = {
+    "image_size": [224, 224],
+    "resample": "bicubic",
+    "color": "RGB",
+    "scale": "mobilenet_v2",  # x / 127.5 - 1 -> [-1, 1]
+}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+# --------------------------------------------------
+# Lookup
+# --------------------------------------------------
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(registry_dir)
+        if name.startswith("v") and name[1:].isdigit()
+        and os.path.exists(os.path.join(registry_dir, name, "manifest.json"))
+    )
+
+
+def latest_version(registry_dir=REGISTRY_DIR):
+    path = os.path.join(registry_dir, LATEST_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return f.read().strip() or None
+    versions = list_versions(registry_dir)
+    return versions[-1] if versions else None
+
+
+def normalize_version(version):
+    # "3", "v3" and "v0003" all name the same folder
+    return f"v{int(str(version).lstrip('v')):04d}"
+
+
+def resolve_version(version="latest", registry_dir=REGISTRY_DIR):
+    """
+    Manifest of a registered version ("latest" or pinned), with its
+    folder under "path". Reads JSON only, so it is cheap to poll.
+    Returns None when "latest" is asked of an empty registry.
+    """
+    if version in (None, "latest"):
+        name = latest_version(registry_dir)
+        if name is None:
+            return None
+    else:
+        name = normalize_version(version)
+
+    path = os.path.join(registry_dir, name)
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Model version {name} not found in {registry_dir}")
+
+    with open(manifest_path) as f:
+        entry = json.load(f)
+    entry["path"] = path
+    return entry
+
+
+def version_id(entry):
+    # Identifies the weights, e.g. for prediction cache keys
+    return f"{entry['version']}:{entry['sha256'][:12]}"
+
+
+def model_file(entry, backend="keras"):
+    if backend == "tflite":
+        path = os.path.join(entry["path"], TFLITE_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{entry['version']} has no {TFLITE_FILE}")
+        return path
+    return os.path.join(entry["path"], entry["model_file"])
+
+# --------------------------------------------------
+# Loading
+# --------------------------------------------------
+def load_version(entry, backend="keras", warmup=True, num_threads=None, verify=True):
+    """
+    Loads a registered version through utils.inference.load_predictor.
+    Returns (predictor, timings) where timings holds the cold-load
+    breakdown in milliseconds.
+    """
+    from utils.inference import load_predictor
+
+    path = model_file(entry, backend)
+    timings = {}
+
+    start = time.perf_counter()
+    if verify and backend == "keras" and file_sha256(path) != entry["sha256"]:
+        raise ValueError(f"{path} does not match the content hash in its manifest")
+    timings["verify_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    predictor = load_predictor(path, backend=backend, warmup=False, num_threads=num_threads)
+    timings["load_ms"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if warmup:
+        predictor(_dummy_batch(entry))
+    timings["warmup_ms"] = (time.perf_counter() - start) * 1000
+
+    timings["cold_load_ms"] = sum(timings.values())
+    return predictor, timings
+
+
+def _dummy_batch(entry):
+    import numpy as np
+    height, width = entry["preprocessing"]["image_size"]
+    return np.zeros((1, height, width, 3), np.float32)
+
+# --------------------------------------------------
+# Publishing
+# --------------------------------------------------
+def publish(
+    model,
+    class_names,
+    metrics=None,
+    preprocessing=PREPROCESSING,
+    registry_dir=REGISTRY_DIR,
+    extra_files=None,
+    source=None,
+    set_latest=True
+):
+    """
+    Registers a Keras model (object or path to any format Keras loads)
+    as the next version and returns its manifest. extra_files maps file
+    names in the version folder to paths to copy, e.g. the TFLite exports.
+    """
+    import tensorflow as tf
+
+    if isinstance(model, str):
+        source = source or model
+        model = tf.keras.models.load_model(model)
+
+    os.makedirs(registry_dir, exist_ok=True)
+    versions = list_versions(registry_dir)
+    version = normalize_version(int(versions[-1][1:]) + 1 if versions else 1)
+
+    tmp_dir = os.path.join(registry_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    model_path = os.path.join(tmp_dir, MODEL_FILE)
+    model.save(model_path)
+    for name, path in (extra_files or {}).items():
+        if os.path.exists(path):
+            shutil.copy2(path, os.path.join(tmp_dir, name))
+
+    entry = {
+        "version": version,
+        "created": time.time(),
+        "model_file": MODEL_FILE,
+        "sha256": file_sha256(model_path),
+        "class_names": list(class_names),
+        "preprocessing": preprocessing,
+        "metrics": metrics or {},
+        "files": sorted(os.listdir(tmp_dir)),
+        "source": source,
+    }
+    _write_json(os.path.join(tmp_dir, "manifest.json"), entry)
+
+    os.rename(tmp_dir, os.path.join(registry_dir, version))
+    if set_latest:
+        set_latest_version(version, registry_dir)
+
+    entry["path"] = os.path.join(registry_dir, version)
+    return entry
+
+
+def set_latest_version(version, registry_dir=REGISTRY_DIR):
+    # Also the rollback path: point LATEST at an older version
+    version = normalize_version(version)
+    resolve_version(version, registry_dir)
+    tmp = os.path.join(registry_dir, LATEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(registry_dir, LATEST_FILE))
+
+
+def update_metrics(entry, metrics):
+    # Metrics are not covered by the content hash, so evaluation runs
+    # can add to an existing version
+    path = os.path.join(entry["path"], "manifest.json")
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["metrics"].update(metrics)
+    _write_json(path, manifest)
+    entry["metrics"] = manifest["metrics"]
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the local model registry.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Show registered versions")
+
+    pub = sub.add_parser("publish", help="Register an existing model file")
+    pub.add_argument("model")
+    pub.add_argument("--class-names", default="class_names.json")
+    pub.add_argument("--metrics", help="JSON file to store as the metrics summary")
+    pub.add_argument("--tflite", help=f"INT8 TFLite export to bundle as {TFLITE_FILE}")
+    pub.add_argument("--tflite-fp16", help=f"float16 TFLite export to bundle as {TFLITE_FP16_FILE}")
+    pub.add_argument("--no-latest", action="store_true")
+
+    latest = sub.add_parser("set-latest", help="Point LATEST at a version (rollback)")
+    latest.add_argument("version")
+
+    load = sub.add_parser("load", help="Measure cold-load time of a version")
+    load.add_argument("version", nargs="?", default="latest")
+    load.add_argument("--backend", default="keras", choices=["keras", "tflite"])
+    return parser.parse_args(argv)
+
+
+def main(args):
+    if args.command == "list":
+        latest = latest_version(args.registry)
+        for name in list_versions(args.registry):
+            entry = resolve_version(name, args.registry)
+            accuracy = entry["metrics"].get("val_accuracy", entry["metrics"].get("accuracy"))
+            marker = "*" if name == latest else " "
+            print(f"{marker} {version_id(entry)}  classes={len(entry['class_names'])}  accuracy={accuracy}")
+
+    elif args.command == "publish":
+        with open(args.class_names) as f:
+            class_names = json.load(f)
+        metrics = None
+        if args.metrics:
+            with open(args.metrics) as f:
+                metrics = json.load(f)
+        entry = publish(
+            args.model,
+            class_names,
+            metrics=metrics,
+            registry_dir=args.registry,
+            extra_files={
+                name: path for name, path in
+                [(TFLITE_FILE, args.tflite), (TFLITE_FP16_FILE, args.tflite_fp16)] if path
+            },
+            set_latest=not args.no_latest
+        )
+        print(f"✅ Registered {version_id(entry)} at {entry['path']}")
+
+    elif args.command == "set-latest":
+        set_latest_version(args.version, args.registry)
+        print(f"✅ LATEST -> {normalize_version(args.version)}")
+
+    elif args.command == "load":
+        entry = resolve_version(args.version, args.registry)
+        if entry is None:
+            raise SystemExit(f"No versions in {args.registry}")
+        _, timings = load_version(entry, backend=args.backend)
+        print(json.dumps({"version": version_id(entry), **timings}, indent=2))
+
+
+if __name__ == "__main__":
+    # Run from the repo root as `python -m utils.model_registry`
+    main(parse_args())
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import namedtuple
+
+from utils.metrics import REGISTRY as metrics
+
+# --------------------------------------------------
+# Reload defaults
+# --------------------------------------------------
+POLL_INTERVAL_S = 30
+
+# One loaded model: the version it was resolved as, its registry entry
+# (or None), the warmed-up predictor and its cold-load timings
+LoadedModel = namedtuple("LoadedModel", ["version", "entry", "predictor", "timings"])
+
+
+class ModelReloader:
+    """
+    Callable predictor that follows a model source without restarts.
+
+    resolve_fn() -> (version, entry) must be cheap (a registry JSON read
+    or a file stat); it is polled every `poll_interval_s`. When the
+    version changes, load_fn(entry) -> (predictor, timings) loads and
+    warms up the new model on the polling thread, and the current model
+    is replaced with one reference assignment. Each call reads that
+    reference once, so batches already running finish on the old model,
+    which is freed when the last of them returns.
+
+    A version whose class names differ from the serving model is not
+    swapped in: labels, cached results and session state all assume the
+    current class order, so that change needs a restart.
+    """
+
+    def __init__(self, resolve_fn, load_fn, poll_interval_s=POLL_INTERVAL_S):
+        self.resolve_fn = resolve_fn
+        self.load_fn = load_fn
+        self.poll_interval_s = poll_interval_s
+
+        version, entry = resolve_fn()
+        predictor, timings = load_fn(entry)
+        self._current = LoadedModel(version, entry, predictor, timings)
+        metrics.observe("model_load_seconds", timings["cold_load_ms"] / 1000)
+        self._rejected = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.reloads = 0
+
+        self._thread = None
+        if poll_interval_s:
+            self._thread = threading.Thread(target=self._poll, name="model-reload", daemon=True)
+            self._thread.start()
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def predictor(self):
+        return self._current.predictor
+
+    def __call__(self, batch):
+        return self._current.predictor(batch)
+
+    def check(self):
+        # One poll; returns True if a new model was swapped in
+        with self._lock:
+            version, entry = self.resolve_fn()
+            current = self._current
+            if version == current.version or version == self._rejected:
+                return False
+
+            old_names, new_names = _class_names(current.entry), _class_names(entry)
+            if old_names is not None and new_names is not None and old_names != new_names:
+                print(f"⚠️ Not reloading {version}: class names changed, restart required")
+                self._rejected = version
+                metrics.inc("model_reloads_total", {"result": "rejected"})
+                return False
+
+            try:
+                predictor, timings = self.load_fn(entry)
+            except Exception as exc:
+                # Keep serving the old model; retried once the version changes
+                print(f"⚠️ Failed to load {version}: {type(exc).__name__}: {exc}")
+                self._rejected = version
+                metrics.inc("model_reloads_total", {"result": "failed"})
+                return False
+
+            self._current = LoadedModel(version, entry, predictor, timings)
+            self.reloads += 1
+
+        metrics.inc("model_reloads_total", {"result": "ok"})
+        metrics.observe("model_load_seconds", timings["cold_load_ms"] / 1000)
+        print(f"🔄 Swapped in {version} ({timings['cold_load_ms']:.0f} ms load, was {current.version})")
+        return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.check()
+            except Exception as exc:
+                # e.g. a version folder removed between listing and reading
+                print(f"⚠️ Model poll failed: {type(exc).__name__}: {exc}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _class_names(entry):
+    # None for models outside the registry (class_names.json is fixed)
+    return None if entry is None else entry["class_names"]
+
+
+def timed_load(load, *args, **kwargs):
+    # (predictor, timings) for loaders that do not time themselves
+    start = time.perf_counter()
+    predictor = load(*args, **kwargs)
+    return predictor, {"cold_load_ms": (time.perf_counter() - start) * 1000}
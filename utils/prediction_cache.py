@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# --------------------------------------------------
+# Cache defaults
+# --------------------------------------------------
+MAX_ENTRIES = 512
+
+
+def model_version(model_path):
+    # Changes whenever the model file is replaced on disk
+    st = os.stat(model_path)
+    return f"{os.path.basename(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def cache_key(data: bytes, version: str):
+    h = hashlib.sha256(version.encode())
+    h.update(data)
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """
+    Bounded LRU of probability vectors keyed by upload content and model
+    version. With `disk_dir` set, entries evicted from memory (and those
+    from earlier processes) are still served from .npy files.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def get(self, key):
+        with self._lock:
+            probs = self._entries.get(key)
+            if probs is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return probs
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            probs = np.load(self._disk_path(key))
+            with self._lock:
+                self.disk_hits += 1
+                self._insert(key, probs)
+            return probs
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, probs):
+        probs = np.asarray(probs, dtype=np.float32)
+        with self._lock:
+            self._insert(key, probs)
+
+        if self.disk_dir:
+            # Write-then-rename so readers never see a partial file
+            tmp = self._disk_path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, probs)
+            os.replace(tmp, self._disk_path(key))
+
+    def _insert(self, key, probs):
+        self._entries[key] = probs
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
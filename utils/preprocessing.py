@@ -1,17 +1,52 @@
-import streamlit as st
-import tensorflow as tf
+import io
 import numpy as np
-import json
 from PIL import Image
-from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
-from math import radians, cos, sin, asin, sqrt
+
+IMAGE_SIZE = (224, 224)
+
+# Matches PIL's default for Image.resize on RGB images
+RESAMPLE = Image.BICUBIC
 
 # --------------------------------------------------
 # Image Preprocessing
 # --------------------------------------------------
+def _open_image(item, size, draft):
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        item = Image.open(io.BytesIO(item))
+
+    # JPEG can downscale by 1/2, 1/4 or 1/8 while decoding; draft never
+    # goes below the requested size, so the final resize still applies
+    if draft and item.format == "JPEG":
+        item.draft("RGB", (size[1], size[0]))
+
+    return item.convert("RGB")
+
+
+def preprocess_batch(
+    items,
+    size=IMAGE_SIZE,
+    resample=RESAMPLE,
+    draft=False,
+    out=None
+):
+    # `items` may mix PIL images and raw encoded bytes. Every image is
+    # written straight into one float32 NHWC buffer, then scaled in place
+    # to MobileNetV2's [-1, 1] range.
+    n = len(items)
+    if out is None:
+        out = np.empty((n, *size, 3), dtype=np.float32)
+    batch = out[:n]
+
+    for i, item in enumerate(items):
+        image = _open_image(item, size, draft)
+        if image.size != (size[1], size[0]):
+            image = image.resize((size[1], size[0]), resample)
+        batch[i] = np.asarray(image)
+
+    batch /= 127.5
+    batch -= 1.0
+    return batch
+
+
 def preprocess_image(image: Image.Image):
-    image = image.convert("RGB")
-    image = image.resize((224, 224))
-    img = np.array(image)
-    img = preprocess_input(img)
-    return np.expand_dims(img, axis=0)
\ No newline at end of file
+    return preprocess_batch([image])
@@ -0,0 +1,152 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from utils.inference import LATENCY_WINDOW, summarize_latencies
+
+# --------------------------------------------------
+# TTA defaults
+# --------------------------------------------------
+MAX_VIEWS = 8
+MIN_VIEWS = 2
+LATENCY_BUDGET_MS = 250
+CROP_FRACTION = 0.875
+EMA_ALPHA = 0.2
+
+# Most useful first: a capped call keeps the leading views
+VIEWS = (
+    "original",
+    "hflip",
+    "center_crop",
+    "hflip_center_crop",
+    "zoom_out",
+    "crop_top_left",
+    "crop_top_right",
+    "crop_bottom_left",
+    "crop_bottom_right",
+)
+
+CROP_ANCHORS = {
+    "center_crop": (0.5, 0.5),
+    "crop_top_left": (0.0, 0.0),
+    "crop_top_right": (0.0, 1.0),
+    "crop_bottom_left": (1.0, 0.0),
+    "crop_bottom_right": (1.0, 1.0),
+}
+
+# --------------------------------------------------
+# Views
+# --------------------------------------------------
+def _resize_matrix(src, dst):
+    # Bilinear weights (half-pixel centers) mapping src samples to dst
+    pos = np.clip((np.arange(dst) + 0.5) * src / dst - 0.5, 0, src - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, src - 1)
+    frac = (pos - lo).astype(np.float32)
+
+    m = np.zeros((dst, src), np.float32)
+    m[np.arange(dst), lo] += 1 - frac
+    m[np.arange(dst), hi] += frac
+    return m
+
+
+def _resize(image, height, width):
+    # Separable bilinear resize as two matrix products
+    h, w, c = image.shape
+    rows = _resize_matrix(h, height) @ image.reshape(h, w * c)
+    return np.einsum("xw,hwc->hxc", _resize_matrix(w, width), rows.reshape(height, w, c))
+
+
+def _crop(image, anchor, fraction):
+    # Crop `fraction` of each side at a (vertical, horizontal) anchor in
+    # [0, 1], then scale back up to the input size
+    h, w, _ = image.shape
+    ch, cw = int(h * fraction), int(w * fraction)
+    top = int(round((h - ch) * anchor[0]))
+    left = int(round((w - cw) * anchor[1]))
+    return _resize(image[top:top + ch, left:left + cw], h, w)
+
+
+def make_view(image, name, fraction=CROP_FRACTION):
+    # `image` is one preprocessed (H, W, 3) float array in [-1, 1]
+    if name == "original":
+        return image
+    if name == "hflip":
+        return image[:, ::-1]
+    if name in CROP_ANCHORS:
+        return _crop(image, CROP_ANCHORS[name], fraction)
+    if name == "hflip_center_crop":
+        return _crop(image[:, ::-1], CROP_ANCHORS["center_crop"], fraction)
+    if name == "zoom_out":
+        h, w, _ = image.shape
+        small = _resize(image, int(h * fraction), int(w * fraction))
+        pad_h, pad_w = h - small.shape[0], w - small.shape[1]
+        return np.pad(
+            small,
+            ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0)),
+            mode="edge"
+        )
+    raise ValueError(f"Unknown TTA view: {name!r}")
+
+
+def tta_batch(image, num_views, fraction=CROP_FRACTION):
+    image = np.asarray(image, dtype=np.float32)
+    if image.ndim == 4:
+        image = image[0]
+    return np.stack([make_view(image, name, fraction) for name in VIEWS[:num_views]])
+
+# --------------------------------------------------
+# Test-time augmentation
+# --------------------------------------------------
+class TestTimeAugmentation:
+    """
+    Averages class probabilities over flipped, cropped and rescaled views
+    of one preprocessed image, predicted as a single batch. The number of
+    views is capped so a call fits `latency_budget_ms`, using the
+    measured per-view cost of earlier calls (starting from `min_views`).
+    """
+
+    def __init__(
+        self,
+        predict_fn,
+        max_views=MAX_VIEWS,
+        min_views=MIN_VIEWS,
+        latency_budget_ms=LATENCY_BUDGET_MS
+    ):
+        self.predict_fn = predict_fn
+        self.max_views = min(max_views, len(VIEWS))
+        self.min_views = min_views
+        self.latency_budget_ms = latency_budget_ms
+
+        self.ms_per_view = None
+        self.last_views = None
+        self.last_latency_ms = None
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def num_views(self):
+        if self.ms_per_view is None:
+            return self.min_views
+        fit = int(self.latency_budget_ms // max(self.ms_per_view, 1e-6))
+        return max(self.min_views, min(self.max_views, fit))
+
+    def __call__(self, image):
+        n = self.num_views()
+
+        start = time.perf_counter()
+        probs = np.asarray(self.predict_fn(tta_batch(image, n)))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        # Includes building the views; fixed overhead makes the estimate
+        # conservative for small batches
+        per_view = elapsed_ms / n
+        self.ms_per_view = per_view if self.ms_per_view is None else (
+            EMA_ALPHA * per_view + (1 - EMA_ALPHA) * self.ms_per_view
+        )
+        self.last_views = n
+        self.last_latency_ms = elapsed_ms
+        self.latencies_ms.append(elapsed_ms)
+        return probs.mean(axis=0)
+
+    def latency_summary(self):
+        return summarize_latencies(self.latencies_ms)
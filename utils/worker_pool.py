@@ -0,0 +1,120 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from utils.inference import IMAGE_SIZE, load_predictor
+from utils.preprocessing import preprocess_batch
+
+# --------------------------------------------------
+# Per-process state
+# --------------------------------------------------
+_predictor = None
+
+
+def _limit_threads(intra_op_threads, inter_op_threads):
+    # Must run before TensorFlow executes its first op in this process
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+def _init_worker(model_path, backend, intra_op_threads, inter_op_threads):
+    global _predictor
+    if _predictor is not None:
+        # Inherited from the parent through fork
+        return
+    if backend == "keras":
+        _limit_threads(intra_op_threads, inter_op_threads)
+    _predictor = load_predictor(model_path, backend=backend, num_threads=intra_op_threads)
+
+
+def _predict_bytes(blobs):
+    # Decoding happens in the worker too, so it also scales across cores
+    return _predictor(preprocess_batch(blobs))
+
+
+def _predict_array(batch):
+    return _predictor(batch)
+
+# --------------------------------------------------
+# Worker Pool
+# --------------------------------------------------
+class ModelWorkerPool:
+    """
+    Spreads inference over worker processes.
+
+    share="fork": the parent loads and warms the TFLite interpreter, then
+        forks; workers inherit it copy-on-write, including the weights
+        XNNPACK repacked at load time, so they are held in RAM once as
+        long as no worker writes to those pages. Workers run
+        single-threaded because thread pools do not survive fork, and the
+        pool must be created before the process starts any other threads
+        (e.g. before an event loop or thread pool is running).
+    share="mmap": each worker (spawned) opens the model itself. The
+        .tflite file is mapped and its pages are shared through the page
+        cache, but the default XNNPACK delegate repacks the weights into
+        private memory in every interpreter, so expect close to one copy
+        of the weights per worker.
+
+    The keras backend supports "mmap" only (TensorFlow is not fork-safe
+    once loaded) and gets one private copy of the weights per worker;
+    use the TFLite export with share="fork" to share weights.
+    """
+
+    def __init__(
+        self,
+        model_path,
+        backend="tflite",
+        workers=None,
+        intra_op_threads=1,
+        inter_op_threads=1,
+        share="mmap"
+    ):
+        global _predictor
+
+        if share not in ("mmap", "fork"):
+            raise ValueError(f"Unknown share mode: {share!r}")
+        if share == "fork" and backend != "tflite":
+            raise ValueError('share="fork" requires the tflite backend')
+        if share == "fork" and intra_op_threads != 1:
+            raise ValueError('share="fork" workers run single-threaded; intra_op_threads must be 1')
+        if backend == "tflite" and inter_op_threads != 1:
+            raise ValueError("inter_op_threads only applies to the keras backend")
+
+        self.workers = workers or os.cpu_count()
+
+        if share == "fork":
+            _predictor = load_predictor(model_path, backend=backend, num_threads=1)
+            context = mp.get_context("fork")
+        else:
+            context = mp.get_context("spawn")
+
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(model_path, backend, intra_op_threads, inter_op_threads)
+        )
+
+        # Workers are started on demand; start and warm all of them now so
+        # fork happens while the parent still holds the loaded model
+        warm = np.zeros((1, *IMAGE_SIZE, 3), dtype=np.float32)
+        done, _ = wait([self.submit(warm) for _ in range(self.workers)])
+        errors = [f.exception() for f in done if f.exception() is not None]
+        if errors:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Worker warm-up failed: {errors[0]!r}") from errors[0]
+
+    def submit_bytes(self, blobs):
+        return self.executor.submit(_predict_bytes, list(blobs))
+
+    def submit(self, batch):
+        return self.executor.submit(_predict_array, batch)
+
+    def predict_bytes(self, blobs, timeout=None):
+        return self.submit_bytes(blobs).result(timeout=timeout)
+
+    def close(self):
+        self.executor.shutdown(wait=True)